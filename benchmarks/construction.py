@@ -0,0 +1,177 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Benchmark of the construction of the circuits.
+
+For each gate of the custom_gates package used by the HHL algorithm and for
+each register size, this script builds the gate in a new circuit and reports:
+1) the wall time of the construction (best of several repetitions),
+2) the peak memory allocated by Python during the construction, measured
+   with tracemalloc in a separate run,
+3) the number of gates and the depth of the built circuit, composite gates
+   being flattened.
+The Hamiltonian simulation gate always acts on 3 qubits, so it is measured
+once, without size.
+The construction of the Qiskit circuit is timed, not its simulation nor
+its export to OpenQASM. The parameters of the Hamiltonian simulation gates
+are loaded before the timed region.
+
+Usage: python benchmarks/construction.py --sizes 4 6 8 --repeat 5
+"""
+
+import argparse
+import time
+import tracemalloc
+import typing
+
+import qiskit
+
+import hhl4x4.solver as solver
+import hhl4x4.utils.endianness as endian
+import hhl4x4.utils.peephole as peephole
+import hhl4x4.custom_gates.hhl
+import hhl4x4.custom_gates.hhl4x4
+import hhl4x4.custom_gates.qft
+import hhl4x4.custom_gates.qpe
+
+
+def _controlled_hamiltonian_powers(size: int) -> typing.Callable:
+    """Return a controlled_hamiltonian_powers callable whose parameters are
+    already loaded for the powers used by a clock register of size qubits."""
+    parameters = [solver.hamiltonian_parameters(power)
+                  for power in range(size)]
+
+    def controlled_hamiltonian_powers(n: int, circuit, control, target):
+        circuit.hamiltonian4x4(control, target, parameters[n])
+
+    return controlled_hamiltonian_powers
+
+
+def build_hamiltonian4x4() -> qiskit.QuantumCircuit:
+    """Build the Hamiltonian simulation gate, which acts on 3 qubits."""
+    qancilla, _, qb = solver.create_registers(1)
+    circuit = qiskit.QuantumCircuit(qancilla, qb)
+    circuit.hamiltonian4x4(qancilla[0], qb)
+    return circuit
+
+
+def build_qft(size: int) -> qiskit.QuantumCircuit:
+    qreg = endian.QRegisterBE(qiskit.QuantumRegister(size))
+    circuit = qiskit.QuantumCircuit(qreg)
+    hhl4x4.custom_gates.qft.qft_be(circuit, qreg, circuit)
+    return circuit
+
+
+def build_approximate_qft(size: int) -> qiskit.QuantumCircuit:
+    qreg = endian.QRegisterBE(qiskit.QuantumRegister(size))
+    circuit = qiskit.QuantumCircuit(qreg)
+    hhl4x4.custom_gates.qft.approximate_qft_be(circuit, qreg, circuit)
+    return circuit
+
+
+def build_qpe(size: int, controlled_hamiltonian_powers: typing.Callable
+              ) -> qiskit.QuantumCircuit:
+    _, qclock, qb = solver.create_registers(size)
+    circuit = qiskit.QuantumCircuit(qclock, qb)
+    circuit.qpe(qclock, qb, controlled_hamiltonian_powers)
+    return circuit
+
+
+def build_hhl(size: int, controlled_hamiltonian_powers: typing.Callable
+              ) -> qiskit.QuantumCircuit:
+    """Build the circuit of 4x4.py, without the measurement."""
+    qancilla, qclock, qb = solver.create_registers(size)
+    circuit = qiskit.QuantumCircuit(qancilla, qclock, qb)
+    circuit.h(qb)
+    circuit.hhl(qancilla, qclock, qb, controlled_hamiltonian_powers, r=6)
+    return circuit
+
+
+def benchmark(build: typing.Callable[..., qiskit.QuantumCircuit],
+              repeat: int = 5, *args) -> typing.Dict:
+    """Measure the construction of a circuit.
+
+    :param build: the function building the circuit. It is called with args,
+    the size of the built registers first if the circuit has a size.
+    :param repeat: the number of timed constructions.
+    :return: the best wall time, the peak memory, the number of gates and the
+    depth of the circuit.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        circuit = build(*args)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    build(*args)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"time": min(times),
+            "peak_memory": peak_memory,
+            "gates": sum(peephole.gate_counts(circuit).values()),
+            "depth": peephole.depth(circuit)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the construction of the circuits of the "
+                    "custom_gates package.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 6, 8],
+                        help="Numbers of qubits of the registers.")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Number of timed constructions of each circuit.")
+    args = parser.parse_args()
+
+    row = "{:<16} {:>4} {:>10.4f} {:>12.1f} {:>7} {:>6}"
+    print("{:<16} {:>4} {:>10} {:>12} {:>7} {:>6}".format(
+        "circuit", "size", "time (s)", "memory (kB)", "gates", "depth"))
+    result = benchmark(build_hamiltonian4x4, args.repeat)
+    print(row.format("hamiltonian4x4", "-", result["time"],
+                     result["peak_memory"] / 1024, result["gates"],
+                     result["depth"]))
+    for size in args.sizes:
+        powers = _controlled_hamiltonian_powers(size)
+        cases = [("qft", build_qft, ()),
+                 ("approximate_qft", build_approximate_qft, ()),
+                 ("qpe", build_qpe, (powers,)),
+                 ("hhl", build_hhl, (powers,))]
+        for name, build, build_args in cases:
+            result = benchmark(build, args.repeat, size, *build_args)
+            print(row.format(name, size, result["time"],
+                             result["peak_memory"] / 1024, result["gates"],
+                             result["depth"]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Benchmark of the constant adder in the approximate Fourier basis.
+
+For each register size and each order of approximation of the quantum
+Fourier transforms, this script builds the circuit adding a constant to a
+register in the Fourier basis, and reports:
+1) the number of gates (after the peephole optimisation pass) and the number
+   of controlled phase gates,
+2) the time needed by the statevector simulation,
+3) the worst probability of obtaining the correct sum over all the basis
+   states given as input.
+The exact row uses apply_in_fourier_basis, the other rows use
+apply_in_approx_fourier_basis.
+
+Usage: python benchmarks/fourier_adder.py --sizes 4 6 8 --constant 5
+"""
+
+import argparse
+import time
+import typing
+
+import numpy as np
+import qiskit
+
+import hhl4x4.utils.endianness as endian
+import hhl4x4.utils.peephole as peephole
+from hhl4x4.utils.circuits import execute
+import hhl4x4.custom_gates.adder
+
+
+def _statevector_index(value: int, size: int) -> int:
+    """Index in the statevector of the big-endian encoding of value."""
+    return sum(((value >> (size - 1 - i)) & 1) << i for i in range(size))
+
+
+def benchmark(size: int, constant: int,
+              approximation: int = None, exact: bool = False) -> typing.Dict:
+    """Build and simulate the constant adder on each basis state.
+
+    :param size: number of qubits of the register.
+    :param constant: the integer added to the register.
+    :param approximation: order of approximation of the quantum Fourier
+    transforms. None selects the default order of ApproximateQFTGate.
+    :param exact: if True, use the exact quantum Fourier transforms and
+    ignore approximation.
+    :return: the gate counts, the simulation time and the worst success
+    probability.
+    """
+    circuits = []
+    for value in range(2 ** size):
+        qreg = endian.QRegisterBE(qiskit.QuantumRegister(size))
+        circuit = qiskit.QuantumCircuit(qreg)
+        for i in range(size):
+            if (value >> (size - 1 - i)) & 1:
+                circuit.x(qreg[i])
+        if exact:
+            circuit.add_constant(constant, qreg, circuit)
+        else:
+            circuit.approximate_add_constant(constant, qreg, circuit,
+                                             approximation)
+        circuit, report = peephole.optimise(circuit, keep_comments=False)
+        circuits.append(circuit)
+
+    state_sim = qiskit.Aer.get_backend('statevector_simulator')
+    start = time.perf_counter()
+    result = execute(circuits, state_sim).result()
+    simulation_time = time.perf_counter() - start
+
+    worst_probability = 1.0
+    for value, circuit in enumerate(circuits):
+        statevector = np.asarray(result.get_statevector(circuit))
+        index = _statevector_index((value + constant) % 2 ** size, size)
+        worst_probability = min(worst_probability,
+                                abs(statevector[index]) ** 2)
+
+    # All the circuits have the same gates, except for the initial X gates.
+    counts = report.counts_after
+    return {"size": size,
+            "approximation": None if exact else approximation,
+            "gates": report.gates_after - counts["x"],
+            "cu1": counts["cu1"],
+            "simulation_time": simulation_time,
+            "worst_probability": float(worst_probability)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the exact and approximate Fourier basis "
+                    "constant adders.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 6, 8],
+                        help="Numbers of qubits of the register.")
+    parser.add_argument("--constant", type=int, default=5,
+                        help="The constant added to the register.")
+    args = parser.parse_args()
+
+    print("{:>4} {:>6} {:>7} {:>5} {:>10} {:>12}".format(
+        "size", "order", "gates", "cu1", "time (s)", "probability"))
+    for size in args.sizes:
+        rows = [benchmark(size, args.constant, exact=True)]
+        rows += [benchmark(size, args.constant, approximation)
+                 for approximation in [None] + list(range(1, size))]
+        for result in rows:
+            order = "exact" if result is rows[0] else \
+                result["approximation"] or "auto"
+            print("{:>4} {:>6} {:>7} {:>5} {:>10.3f} {:>12.4f}".format(
+                size, order, result["gates"], result["cu1"],
+                result["simulation_time"], result["worst_probability"]))
+
+
+if __name__ == '__main__':
+    main()
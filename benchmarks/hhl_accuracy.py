@@ -0,0 +1,258 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Headless benchmark of the accuracy and the throughput of the HHL solver.
+
+For each clock size and each value of the parameter r of the controlled
+rotations, this script builds the HHL circuits of hhl4x4.solver, simulates
+them and solves the system for a corpus of right-hand sides. It records:
+1) the construction time of the circuits and the simulation time,
+2) the time needed to solve the system for the whole corpus once the linear
+   map of the circuit is known, and the corresponding throughput,
+3) for each right-hand side, the probability to measure the ancilla qubit in
+   the state |1> and the error la.norm(solution - x_exact), the solution
+   being scaled to the norm of x_exact and its global phase being aligned
+   with x_exact.
+
+The results are written in a JSON file and compared to a baseline, by
+default the file hhl_accuracy_baseline.json committed next to this script.
+The script exits with a non-zero status if the error, the success
+probability or the times regressed by more than the given tolerances, or if
+the baseline was computed on another corpus of right-hand sides.
+--update-baseline replaces the baseline by the results of the run.
+
+Usage: python benchmarks/hhl_accuracy.py --output results.json
+       python benchmarks/hhl_accuracy.py --update-baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import typing
+
+import numpy as np
+import scipy.linalg as la
+
+import hhl4x4.solver as solver
+from hhl4x4.optimise_parameters import A
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "hhl_accuracy_baseline.json")
+
+
+def right_hand_sides(random_vectors: int = 4,
+                     seed: int = 0) -> np.ndarray:
+    """Build the corpus of right-hand sides.
+
+    :param random_vectors: the number of random right-hand sides added to the
+    corpus.
+    :param seed: seed of the random right-hand sides.
+    :return: an array of shape (k, 4): the uniform vector of the article,
+    the vectors of the canonical basis and the random vectors.
+    """
+    random_state = np.random.RandomState(seed)
+    return np.vstack([np.full((1, 4), 0.5),
+                      np.eye(4),
+                      random_state.uniform(-1, 1, (random_vectors, 4))])
+
+
+def solution_error(solution: np.ndarray, b: np.ndarray) -> float:
+    """Compute la.norm(solution - x_exact) for the normalised solution."""
+    x_exact = la.solve(A, b)
+    solution = la.norm(x_exact) * solution
+    overlap = np.vdot(solution, x_exact)
+    if abs(overlap) > 0:
+        solution = overlap / abs(overlap) * solution
+    return float(la.norm(solution - x_exact))
+
+
+def benchmark(b_vectors: np.ndarray, r: float,
+              clock_size: int) -> typing.Dict:
+    """Solve the system for each right-hand side with the given parameters.
+
+    :param b_vectors: the corpus of right-hand sides, one per row.
+    :param r: parameter of the controlled rotations.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :return: the times, the throughput and the results for each right-hand
+    side.
+    """
+    start = time.perf_counter()
+    circuits = solver.basis_circuits(r, clock_size)
+    construction_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hhl_map = solver.simulate_basis_circuits(circuits)
+    simulation_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    solutions, success_probabilities = solver.solve(b_vectors,
+                                                    hhl_map=hhl_map)
+    solve_time = time.perf_counter() - start
+
+    problems = [{"b": b.tolist(),
+                 "error": solution_error(solution, b),
+                 "success_probability": float(success_probability)}
+                for b, solution, success_probability in
+                zip(b_vectors, solutions, success_probabilities)]
+    return {"clock_size": clock_size,
+            "r": r,
+            "construction_time": construction_time,
+            "simulation_time": simulation_time,
+            "solve_time": solve_time,
+            "throughput": len(b_vectors) / max(solve_time, 1e-12),
+            "max_error": max(problem["error"] for problem in problems),
+            "min_success_probability": min(
+                problem["success_probability"] for problem in problems),
+            "problems": problems}
+
+
+def regressions(results: typing.List[typing.Dict],
+                baseline: typing.List[typing.Dict],
+                time_tolerance: float = 0.5, error_tolerance: float = 1e-3,
+                probability_tolerance: float = 1e-3,
+                time_resolution: float = 0.1) -> typing.List[str]:
+    """Compare the results of a run to a baseline.
+
+    :param results: the results of the run, as returned by benchmark.
+    :param baseline: the results of a previous run.
+    :param time_tolerance: the relative increase allowed for the times.
+    :param error_tolerance: the absolute increase allowed for the errors.
+    :param probability_tolerance: the absolute decrease allowed for the
+    success probabilities.
+    :param time_resolution: the absolute increase, in seconds, always allowed
+    for the times. It prevents the timer noise on short measures from being
+    reported as a regression.
+    :return: the description of each regression, empty if there is none.
+    """
+    reference = {(result["clock_size"], result["r"]): result
+                 for result in baseline}
+    found = []
+    for result in results:
+        key = (result["clock_size"], result["r"])
+        if key not in reference:
+            continue
+        previous = reference[key]
+        name = "clock_size={}, r={}".format(*key)
+        b_vectors = [problem["b"] for problem in result["problems"]]
+        previous_b = [problem["b"] for problem in previous["problems"]]
+        if len(b_vectors) != len(previous_b) or \
+                not np.allclose(b_vectors, previous_b):
+            found.append("{}: the baseline was computed on other right-hand "
+                         "sides".format(name))
+            continue
+        for measure in ("construction_time", "simulation_time"):
+            if result[measure] > (1 + time_tolerance) * previous[measure] \
+                    + time_resolution:
+                found.append("{}: {} increased from {:.3f}s to {:.3f}s".format(
+                    name, measure, previous[measure], result[measure]))
+        if result["max_error"] > previous["max_error"] + error_tolerance:
+            found.append("{}: max_error increased from {:.2e} to {:.2e}"
+                         "".format(name, previous["max_error"],
+                                   result["max_error"]))
+        if result["min_success_probability"] < \
+                previous["min_success_probability"] - probability_tolerance:
+            found.append("{}: min_success_probability decreased from {:.4f} "
+                         "to {:.4f}".format(name,
+                                            previous["min_success_probability"],
+                                            result["min_success_probability"]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the accuracy and the throughput of the HHL "
+                    "solver and compare them to a baseline.")
+    parser.add_argument("--clock-sizes", type=int, nargs="+", default=[4],
+                        help="Numbers of qubits of the clock register.")
+    parser.add_argument("-r", type=float, nargs="+", default=[5.75, 6],
+                        help="Parameters of the controlled rotations.")
+    parser.add_argument("--random-vectors", type=int, default=4,
+                        help="Number of random right-hand sides.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the random right-hand sides.")
+    parser.add_argument("--output", default="hhl_accuracy.json",
+                        help="JSON file receiving the results.")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="JSON file written by a previous run.")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write the results to the baseline instead of "
+                             "comparing them.")
+    parser.add_argument("--time-tolerance", type=float, default=0.5,
+                        help="Relative increase allowed for the times.")
+    parser.add_argument("--error-tolerance", type=float, default=1e-3,
+                        help="Absolute increase allowed for the errors.")
+    parser.add_argument("--probability-tolerance", type=float, default=1e-3,
+                        help="Absolute decrease allowed for the success "
+                             "probabilities.")
+    parser.add_argument("--time-resolution", type=float, default=0.1,
+                        help="Absolute increase in seconds always allowed "
+                             "for the times.")
+    args = parser.parse_args()
+
+    b_vectors = right_hand_sides(args.random_vectors, args.seed)
+    print("{:>5} {:>6} {:>10} {:>10} {:>12} {:>10} {:>8}".format(
+        "clock", "r", "build (s)", "sim (s)", "rhs/s", "max error",
+        "min p"))
+    results = []
+    for clock_size in args.clock_sizes:
+        for r in args.r:
+            result = benchmark(b_vectors, r, clock_size)
+            results.append(result)
+            print("{:>5} {:>6} {:>10.3f} {:>10.3f} {:>12.1f} {:>10.2e} "
+                  "{:>8.4f}".format(clock_size, r,
+                                    result["construction_time"],
+                                    result["simulation_time"],
+                                    result["throughput"], result["max_error"],
+                                    result["min_success_probability"]))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.time_tolerance,
+                            args.error_tolerance, args.probability_tolerance,
+                            args.time_resolution)
+        for regression in found:
+            print("Regression: {}".format(regression))
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+"""Benchmark of the approximate quantum Fourier transform of the QPE.
+
+For each clock size and each order of approximation of the inverse quantum
+Fourier transform used by the quantum phase estimation, this script builds
+the HHL circuit solving the 4x4 system for the uniform superposition |b>,
+and reports:
+1) the number of gates (after the peephole optimisation pass) and the number
+   of controlled phase gates,
+2) the time needed by the statevector simulation,
+3) the error on the normalised solution.
+
+Usage: python benchmarks/qft_approximation.py --clock-sizes 4 6 8
+"""
+
+import argparse
+import time
+import typing
+
+import numpy as np
+import qiskit
+
+import hhl4x4.solver as solver
+import hhl4x4.utils.peephole as peephole
+import hhl4x4.utils.statevector as statevector_utils
+from hhl4x4.utils.circuits import execute
+from hhl4x4.optimise_parameters import A
+import hhl4x4.custom_gates.hhl
+
+
+def benchmark(clock_size: int, approximation: int = None,
+              r: float = 6) -> typing.Dict:
+    """Build and simulate the HHL circuit with the given approximation.
+
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :param approximation: order of approximation of the inverse QFT. None
+    selects the default order of ApproximateQFTGate.
+    :param r: parameter of the controlled rotations.
+    :return: the gate counts, the simulation time and the solution error.
+    """
+    qancilla, qclock, qb = solver.create_registers(clock_size)
+    circuit = qiskit.QuantumCircuit(qancilla, qclock, qb)
+    circuit.h(qb)
+    circuit.hhl(qancilla, qclock, qb, solver.controlled_hamiltonian_powers,
+                r, qft_approximation=approximation)
+    circuit, report = peephole.optimise(circuit, keep_comments=False)
+
+    state_sim = qiskit.Aer.get_backend('statevector_simulator')
+    start = time.perf_counter()
+    result = execute([circuit], state_sim).result()
+    simulation_time = time.perf_counter() - start
+
+    statevector, success_probability = statevector_utils.postselect(
+        np.asarray(result.get_statevector(circuit)), 0, True)
+    solution = statevector[::2 ** clock_size]
+    solution = solution / np.linalg.norm(solution)
+    exact_solution = np.linalg.solve(A, np.full(4, 0.5))
+    exact_solution /= np.linalg.norm(exact_solution)
+    overlap = np.vdot(exact_solution, solution)
+    error = np.linalg.norm(solution - overlap / abs(overlap) * exact_solution)
+
+    return {"clock_size": clock_size,
+            "approximation": approximation,
+            "gates": report.gates_after,
+            "cu1": report.counts_after["cu1"],
+            "simulation_time": simulation_time,
+            "success_probability": success_probability,
+            "error": float(error)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the orders of approximation of the inverse QFT "
+                    "used by the quantum phase estimation.")
+    parser.add_argument("--clock-sizes", type=int, nargs="+", default=[4, 6, 8],
+                        help="Numbers of qubits of the clock register.")
+    parser.add_argument("-r", type=float, default=6,
+                        help="Parameter of the controlled rotations.")
+    args = parser.parse_args()
+
+    print("{:>5} {:>6} {:>7} {:>5} {:>10} {:>10}".format(
+        "clock", "order", "gates", "cu1", "time (s)", "error"))
+    for clock_size in args.clock_sizes:
+        # The default order is printed as "auto".
+        for approximation in [None] + list(range(1, clock_size + 1)):
+            result = benchmark(clock_size, approximation, args.r)
+            print("{:>5} {:>6} {:>7} {:>5} {:>10.3f} {:>10.2e}".format(
+                clock_size, approximation or "auto", result["gates"],
+                result["cu1"], result["simulation_time"], result["error"]))
+
+
+if __name__ == '__main__':
+    main()
@@ -35,31 +35,20 @@
 
 """
 
-import copy
-
 import numpy as np
 import qiskit
 import scipy.linalg as la
-from sympy import pi
 
+import hhl4x4.sampling as sampling
+import hhl4x4.solver as solver
+import hhl4x4.tuning as tuning
+import hhl4x4.utils.checkpoints as checkpoints
+import hhl4x4.utils.circuits as circuits
 import hhl4x4.utils.endianness as endian
+import hhl4x4.utils.peephole as peephole
+import hhl4x4.utils.statevector as statevector_utils
 import hhl4x4.custom_gates.comment
-import hhl4x4.custom_gates.hhl4x4
-import hhl4x4.custom_gates.qpe
-
-
-def postselect(statevector: np.ndarray, qubit_index: int, value: bool):
-    mask = 1 << qubit_index
-    if value:
-        array_mask = np.arange(len(statevector)) & mask
-    else:
-        array_mask = not (np.arange(len(statevector)) & mask)
-
-    def normalise(vec: np.ndarray):
-        from scipy.linalg import norm
-        return vec / norm(vec)
-
-    return normalise(statevector[array_mask != 0])
+import hhl4x4.custom_gates.hhl
 
 
 def round_to_zero(vec: np.ndarray, tol=2e-15):
@@ -73,75 +62,66 @@ def reverse_endianness(i: int, length: int) -> int:
 
 
 def main():
-    qancilla = endian.QRegisterBE(qiskit.QuantumRegister(1))
-    qclock = endian.QRegisterBE(qiskit.QuantumRegister(4))
-    qb = endian.QRegisterBE(qiskit.QuantumRegister(2))
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Solve the 4x4 system with the HHL algorithm.")
+    parser.add_argument("--sample", action="store_true",
+                        help="Also estimate the solution from measurements "
+                             "only, with adaptive batches of shots.")
+    parser.add_argument("--shots", type=int, default=10**5,
+                        help="Maximum number of shots used by each sampling "
+                             "(default to 100000).")
+    parser.add_argument("--target-error", type=float, default=0.02,
+                        help="Half-width of the confidence intervals at which "
+                             "the sampling stops (default to 0.02).")
+    parser.add_argument("--amplify", action="store_true",
+                        help="Also estimate the solution from measurements "
+                             "after amplifying the success branch of the "
+                             "circuit with amplitude amplification.")
+    parser.add_argument("--tune-r", action="store_true",
+                        help="Choose the parameter r of the controlled "
+                             "rotations with hhl4x4.tuning.tune_r instead of "
+                             "using r = 6.")
+    args = parser.parse_args()
+
+    qancilla, qclock, qb = solver.create_registers()
     classical = endian.CRegister(qiskit.ClassicalRegister(1))
 
     circuit = qiskit.QuantumCircuit(qancilla, qclock, qb, classical)
 
+    # The preparation of b and the HHL algorithm are grouped in one gate,
+    # which is inverted by the amplitude amplification.
+    qubits = [register[i] for register in (qancilla, qclock, qb)
+              for i in range(len(register))]
+    state_preparation = qiskit.CompositeGate("state_preparation", [], qubits,
+                                             circuit)
+
     # 0. Initialise b
-    circuit.comment("[4x4] Initialising b.")
-    circuit.h(qb)
-    circuit.comment("[4x4] Initialisation done!")
-
-    # 1. Quantum Phase Estimation
-    def controlled_hamiltonian_powers(n: int, circuit, control, target):
-        # Previous method: just applying an optimized hamiltonian an exponential
-        # number of times.
-        # for i in range(2**n):
-        #     #circuit.hamiltonian4x4(control, target).inverse()
-        #     circuit.hamiltonian4x4(control, target)
-
-        # Hard-coded values obtained thanks to optimise_parameters.py
-        # The error (2-norm of the difference between the unitary matrix of the
-        # quantum circuit and the true matrix) is bounded by 1e-7, no matter the
-        # value of n.
-        power = 2 ** n
-        if power == 1:
-            params = [0.19634953, 0.37900987, 0.9817477, 1.87900984, 0.58904862]
-        elif power == 2:
-            params = [1.9634954, 1.11532058, 1.9634954, 2.61532069, 1.17809726]
-        elif power == 4:
-            params = [-0.78539816, 1.01714584, 3.92699082, 2.51714589,
-                      2.35619449]
-        elif power == 8:
-            params = [-9.01416169e-09, -0.750000046, 1.57079632, 0.750000039,
-                      -1.57079633]
-        else:
-            raise NotImplementedError(
-                "You asked for a non-implemented power: {}".format(power))
-        circuit.hamiltonian4x4(control, target, params)
-
-    circuit.comment("[4x4] 1. Quantum phase estimation.")
-    qpe_gate = circuit.qpe(qclock, qb, controlled_hamiltonian_powers)
-
-    ## 2. Phase rotation controlled by the eigenvalue.
-    circuit.comment("[4x4] Inverting computed eigenvalues.")
-    circuit.swap(qclock[1], qclock[2])
+    state_preparation.comment("[4x4] Initialising b.")
+    state_preparation.h(qb)
+    state_preparation.comment("[4x4] Initialisation done!")
 
+    # 1. Quantum phase estimation, 2. phase rotation controlled by the
+    # eigenvalue and 3. uncomputation of the quantum phase estimation.
     # r is a parameter of the circuit.
-    # A good value is between 5 and 6 according to the article.
+    # A good value is between 5 and 6 according to the article. With
+    # --tune-r, it is chosen to maximise the probability to measure the
+    # ancilla qubit in the state |1> while keeping the error on the solution
+    # small.
     r = 6
-    circuit.comment("[4x4] 2. Phase rotation.")
+    if args.tune_r:
+        r = tuning.tune_r()["r"]
+    print("Parameter of the controlled rotations: r = {}".format(r))
+    state_preparation.hhl(qancilla, qclock, qb,
+                          solver.controlled_hamiltonian_powers, r)
+    circuit._attach(state_preparation)
 
-    def cry(circuit, theta, ctrl, target):
-        circuit.comment("CRY")
-        # Apply the supposed c-RY operation.
-        circuit.cu3(theta, 0, 0, ctrl, target)
+    # Simplify the generated gates before exporting and simulating the circuit.
+    circuit, report = peephole.optimise(circuit)
+    print(report)
 
-    for i in range(len(qclock)):
-        cry(circuit, 2 ** (len(qclock) - i - r) * pi,
-            qclock[len(qclock) - 1 - i], qancilla[0])
-
-    circuit.comment("Inverting the inversion of eigenvalues.")
-    circuit.swap(qclock[1], qclock[2])
-
-    ## 3. Uncompute the Quantum Phase Estimation.
-    circuit.comment("[4x4] 3. Inverting quantum phase estimation.")
-    circuit._attach(copy.deepcopy(qpe_gate).inverse())
-
-    circuit_no_measure = copy.deepcopy(circuit)
+    circuit_no_measure = circuits.snapshot(circuit)
 
     ## 4. Measure the ancilla qubit to check.
     circuit.comment("[4x4] 4. Measurement.")
@@ -154,50 +134,56 @@ def main():
     state_sim = qiskit.Aer.get_backend('statevector_simulator')
     unitary_sim = qiskit.Aer.get_backend('unitary_simulator')
 
-    # res_qasm = execute([circuit], qasm_sim, shots=10**5).result()
-    # counts = res_qasm.get_counts()
-    # filtered_counts = {key: counts[key] for key in counts if key[-1] == '1'}
-    # significant_counts = {key: counts[key] for key in counts if counts[key]
-    #  > 100}
-    # significant_filtered_counts = {key: filtered_counts[key]
-    #                                for key in filtered_counts
-    #                                if filtered_counts[key] > 5000}
-    # print("Counts:", counts, sep='\n')
-
-    res_state = qiskit.execute([circuit_no_measure], state_sim).result()
-    full_state = res_state.get_statevector()
-
-    # The obtained full state is encoded with Qiskit's register order which
-    # is not
-    # the order we want. We need to change the array so that we reverse the
-    # order of each register.
-    size = full_state.shape[0]
-    full_state_reversed = np.zeros((size,), dtype=full_state.dtype)
-    for i in range(size):
-        qubit_ancilla_value = i & 0b1
-        qubit_clock_value = (i >> 1) & 0b1111
-        qubit_b_value = (i >> 5) & 0b11
-        reversed_regs_id = qubit_b_value | (qubit_clock_value << 2) | (
-            qubit_ancilla_value << 6)
-        full_state_reversed[reversed_regs_id] = full_state[i]
-    full_state = full_state_reversed
-
-    # full_state = reverse_indices_endianness(full_state)
-    statevector = round_to_zero(postselect(full_state, 6, True), 1e-3)
-
-    solution = np.sqrt(340) * statevector[:4]
+    # The statevectors after the stages of the circuit are cached, so only
+    # the stages that changed since the last run are simulated.
+    full_state = checkpoints.simulate(circuit_no_measure, backend=state_sim)
+
+    # The ancilla qubit is the first qubit of the circuit. In the postselected
+    # statevector, the clock register is the least significant part of the
+    # index, so the amplitudes with the clock register in the state |0> are
+    # the amplitudes of the |x> register.
+    statevector, success_probability = statevector_utils.postselect(
+        full_state, 0, True)
+    statevector = round_to_zero(statevector[::2 ** len(qclock)], 1e-3)
+
+    solution = np.sqrt(340) * statevector
     x_exact = np.array([-1, 7, 11, 13])
 
     print("Exact solution: {}".format(x_exact))
     print("Experimental solution: {}".format(solution))
     print("Error in found solution: {}".format(la.norm(solution - x_exact)))
+    print("Probability to measure the ancilla qubit in the state |1>: "
+          "{}".format(success_probability))
+
+    if args.sample:
+        # Estimate the solution from measurements only, with adaptive batches
+        # of shots.
+        estimation = sampling.sample_solution(
+            circuit_no_measure, qancilla, qclock, qb, backend=qasm_sim,
+            target_error=args.target_error, max_shots=args.shots)
+        print("Sampled solution moduli: {} (+/- {:.3f} with {} shots)".format(
+            np.sqrt(340) * estimation["solution"], np.sqrt(340) * estimation[
+                "error"], estimation["shots"]))
+
+    if args.amplify:
+        # The same estimation, with the success branch amplified first.
+        estimation = sampling.sample_amplified_solution(
+            state_preparation, qancilla, qclock, qb, backend=qasm_sim,
+            target_error=args.target_error, max_shots=args.shots)
+        print("Amplified sampled solution moduli: {} (+/- {:.3f} with {} "
+              "shots and {} rounds of amplification)".format(
+            np.sqrt(340) * estimation["solution"], np.sqrt(340) * estimation[
+                "error"], estimation["shots"], estimation["rounds"]))
 
     # res_unitary = execute([circuit_no_measure], unitary_sim,
     # skip_translation=skip).result()
     # unitary = res_unitary.get_unitary()
     # print("Unitary matrix:", unitary, sep='\n')
 
-    amplitudes = np.absolute(full_state) ** 2
+    # The plotted state is encoded with the ancilla qubit as the most
+    # significant bit, then the clock register and the b register.
+    full_state = statevector_utils.reorder_registers(
+        full_state, [len(qancilla), len(qclock), len(qb)])
 
     X = np.arange(len(full_state))
     import matplotlib.pyplot as plt
@@ -0,0 +1,121 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""This module contains functions to add a constant to a quantum register.
+
+The addition is performed in the Fourier basis (see
+https://arxiv.org/abs/quant-ph/0008033): once the register is in the Fourier
+basis, adding a constant only needs one phase gate per qubit. The quantum
+Fourier transforms surrounding the phase gates can be approximated to reduce
+the number of controlled phase gates, at the price of an approximate
+addition.
+"""
+
+import sympy as sym
+from qiskit import QuantumCircuit, CompositeGate
+from hhl4x4.utils.endianness import QRegisterBase
+from hhl4x4.custom_gates.qft import apply_in_fourier_basis, \
+    apply_in_approx_fourier_basis
+
+
+class PhaseAdderGate(CompositeGate):
+    """Add a constant to a quantum register in the Fourier basis.
+
+    The register should be in the state returned by qft_be or
+    approximate_qft_be, i.e. the qubit k of the register (in access order)
+    stores the phase 2*pi*x/2**(k+1) where x is the integer encoded in the
+    register before the quantum Fourier transform.
+    """
+
+    def __init__(self, constant: int, qreg: QRegisterBase,
+                 qcirc: QuantumCircuit):
+        """Initialise a PhaseAdderGate.
+
+        :param constant: the integer to add, modulo 2**len(qreg).
+        :param qreg: the quantum register, in the Fourier basis.
+        :param qcirc: the associated quantum circuit.
+        """
+        qubits_number = len(qreg)
+        used_qubits = [qreg[i] for i in range(qubits_number)]
+
+        super().__init__(self.__class__.__name__,  # name
+                         [constant],  # parameters
+                         used_qubits,  # qubits
+                         qcirc)  # circuit
+
+        for k in range(qubits_number):
+            # Only the constant modulo 2**(k+1) changes the phase of the
+            # qubit k.
+            numerator = constant % 2 ** (k + 1)
+            if numerator:
+                self.u1(2 * sym.pi * numerator / 2 ** (k + 1), qreg[k])
+
+
+def phase_add(self, qreg: QRegisterBase, constant: int) -> PhaseAdderGate:
+    """Add a PhaseAdderGate."""
+    self._check_qreg(qreg)
+    return self._attach(PhaseAdderGate(constant, qreg, self))
+
+
+def add_constant(self, constant: int, qreg: QRegisterBase,
+                 qcirc: QuantumCircuit) -> None:
+    """Add a constant to a big-endian register, modulo 2**len(qreg).
+
+    :param constant: the integer to add.
+    :param qreg: the quantum register, in the computational basis.
+    :param qcirc: the associated quantum circuit.
+    """
+    apply_in_fourier_basis(self, phase_add, qreg, qcirc, constant=constant)
+
+
+def approximate_add_constant(self, constant: int, qreg: QRegisterBase,
+                             qcirc: QuantumCircuit,
+                             approximation: int = None) -> None:
+    """Add a constant to a big-endian register with approximate quantum
+    Fourier transforms.
+
+    :param constant: the integer to add.
+    :param qreg: the quantum register, in the computational basis.
+    :param qcirc: the associated quantum circuit.
+    :param approximation: the order of approximation of the quantum Fourier
+    transforms, see ApproximateQFTGate.
+    """
+    apply_in_approx_fourier_basis(self, phase_add, qreg, qcirc,
+                                  approximation, constant=constant)
+
+
+QuantumCircuit.phase_add = phase_add
+CompositeGate.phase_add = phase_add
+QuantumCircuit.add_constant = add_constant
+CompositeGate.add_constant = add_constant
+QuantumCircuit.approximate_add_constant = approximate_add_constant
+CompositeGate.approximate_add_constant = approximate_add_constant
@@ -0,0 +1,162 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+"""This module contains an implementation of the amplitude amplification.
+
+The HHL algorithm only succeeds when the ancilla qubit is measured in the
+state |1>. If the circuit A preparing the state has a success probability
+p = sin^2(theta), each round of amplitude amplification
+    Q = - A S_0 A^{-1} S_good
+rotates the state by 2 theta towards the good states, so that after k rounds
+the success probability is sin^2((2k + 1) theta). With the number of rounds
+given by optimal_rounds, the success probability is close to 1 and about
+1/sqrt(p) applications of A are needed per solution instead of 1/p.
+See https://arxiv.org/abs/quant-ph/0005055.
+"""
+
+import math
+import typing
+
+from qiskit import QuantumCircuit, QuantumRegister, CompositeGate
+from sympy import pi
+from sympy.combinatorics.graycode import GrayCode
+
+import hhl4x4.custom_gates.comment
+import hhl4x4.custom_gates.inverse
+
+QubitType = typing.Tuple[QuantumRegister, int]
+
+
+def optimal_rounds(success_probability: float) -> int:
+    """Number of rounds maximising the amplified success probability.
+
+    :param success_probability: the success probability p of the circuit
+    without amplification.
+    :return: the integer k closest to pi / (4 theta) - 1/2, with
+    sin^2(theta) = p.
+    """
+    if not 0 < success_probability <= 1:
+        raise ValueError("The success probability should be in ]0, 1], got "
+                         "{}.".format(success_probability))
+    theta = math.asin(math.sqrt(success_probability))
+    return max(0, round(math.pi / (4 * theta) - 0.5))
+
+
+def amplified_success_probability(success_probability: float,
+                                  rounds: int) -> float:
+    """Success probability after the given number of rounds."""
+    theta = math.asin(math.sqrt(success_probability))
+    return math.sin((2 * rounds + 1) * theta) ** 2
+
+
+def _multi_controlled_u1(container, theta: float,
+                         controls: typing.List[QubitType], target: QubitType):
+    """Apply a u1(theta) gate on target, controlled by all the controls.
+
+    The phase theta * x_1 * ... * x_n is decomposed as a sum of phases on
+    the parities of the controls, which are computed in the order of a Gray
+    code so that each parity is obtained from the previous one with a few
+    CNOT gates. No ancilla qubit is needed.
+    """
+    if not controls:
+        container.u1(theta, target)
+        return
+    angle = theta / 2 ** (len(controls) - 1)
+    last_pattern = None
+    for pattern in GrayCode(len(controls)).generate_gray():
+        if '1' not in pattern:
+            continue
+        if last_pattern is None:
+            last_pattern = pattern
+        # The parity of the controls in pattern is stored on the control
+        # corresponding to the left-most 1 of pattern.
+        leftmost = pattern.index('1')
+        changed = [i for i, (bit, last_bit) in
+                   enumerate(zip(pattern, last_pattern)) if bit != last_bit]
+        if changed:
+            if changed[0] != leftmost:
+                container.cx(controls[changed[0]], controls[leftmost])
+            else:
+                ones = [i for i, bit in enumerate(pattern) if bit == '1']
+                for i in ones[1:]:
+                    container.cx(controls[i], controls[leftmost])
+        if pattern.count('1') % 2 == 0:
+            container.cu1(-angle, controls[leftmost], target)
+        else:
+            container.cu1(angle, controls[leftmost], target)
+        last_pattern = pattern
+
+
+class AmplitudeAmplificationGate(CompositeGate):
+
+    def __init__(self, state_preparation: CompositeGate, good_qubit: QubitType,
+                 rounds: int, qcirc: QuantumCircuit = None):
+        """Initialize the AmplitudeAmplificationGate class.
+
+        :param state_preparation: the gate A preparing the amplified state
+        from |0...0>, applied before this gate. The amplification acts on the
+        qubits of A. The gate is not modified.
+        :param good_qubit: the qubit that should be measured in the state |1>.
+        :param rounds: the number of rounds of amplification, see
+        optimal_rounds.
+        :param qcirc: The associated quantum circuit.
+        """
+        used_qubits = list(state_preparation.arg)
+
+        super().__init__(self.__class__.__name__,  # name
+                         [rounds],  # parameters
+                         used_qubits,  # qubits
+                         qcirc)  # circuit
+
+        for i in range(rounds):
+            self.comment("[AA] Round {}: reflection around the good "
+                         "states.".format(i + 1))
+            self.z(good_qubit)
+            self.comment("[AA] Reflection around the prepared state.")
+            self.inverse_of(state_preparation)
+            for qubit in used_qubits:
+                self.x(qubit)
+            _multi_controlled_u1(self, pi, used_qubits[:-1], used_qubits[-1])
+            for qubit in used_qubits:
+                self.x(qubit)
+            self._attach(state_preparation)
+
+
+def amplify(self, state_preparation: CompositeGate, good_qubit: QubitType,
+            rounds: int) -> AmplitudeAmplificationGate:
+    """Add rounds of amplitude amplification after state_preparation."""
+    self._check_qubit(good_qubit)
+    return self._attach(AmplitudeAmplificationGate(state_preparation,
+                                                   good_qubit, rounds, self))
+
+
+QuantumCircuit.amplify = amplify
+CompositeGate.amplify = amplify
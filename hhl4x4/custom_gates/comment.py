@@ -32,24 +32,29 @@
 """Implementation of a comment instruction.
 
 The comment instruction is a hack to be able to insert comments in the
-generated OpenQASM code. Comments are then ignored and removed by the
-Qiskit compiler so they will only appear in the generated OpenQASM.
+generated OpenQASM code. Comments are removed before the circuits are
+executed so they will only appear in the generated OpenQASM.
 
-The Comment gate overloads the Barrier gate, which *does not* change the
-circuit result but *might change* the final OpenQASM code by preventing
-some optimisations.
+The Comment instruction overloads the Barrier instruction but does not act on
+any qubit: attaching a comment costs O(1) and a comment never prevents an
+optimisation. Qiskit can not compile a barrier without qubits, so the
+comments are removed with the strip_comments function before a circuit is
+executed, see hhl4x4.utils.circuits.execute.
 """
 
+import typing
+
 import qiskit
+from qiskit import CompositeGate
 from qiskit.extensions.standard.barrier import Barrier
 
 
 class Comment(Barrier):
     """Instruction inserting a comment in the OpenQASM code."""
 
-    def __init__(self, text: str, qubits, circ):
+    def __init__(self, text: str, circ):
         """Create new comment."""
-        super().__init__(qubits, circ)
+        super().__init__([], circ)
         self._text = text
 
     def inverse(self):
@@ -71,14 +76,41 @@ class Comment(Barrier):
 
 def comment(self, text: str):
     """Write a comment to circuit."""
-    all_qubits = []
-    circuit = self
-    while not hasattr(circuit, 'regs'):
-        circuit = circuit.circuit
-    for _, register in circuit.regs.items():
-        if isinstance(register, qiskit.QuantumRegister):
-           all_qubits.extend((register[i] for i in range(len(register))))
-    return self._attach(Comment(text, all_qubits, self))
+    return self._attach(Comment(text, self))
+
+
+def _contains_comments(instruction) -> bool:
+    if isinstance(instruction, CompositeGate):
+        return any(map(_contains_comments, instruction.data))
+    return isinstance(instruction, Comment)
+
+
+def _instructions_without_comments(instructions) -> typing.Iterator:
+    for instruction in instructions:
+        if not _contains_comments(instruction):
+            yield instruction
+        elif isinstance(instruction, CompositeGate):
+            yield from _instructions_without_comments(instruction.data)
+
+
+def strip_comments(circuit: qiskit.QuantumCircuit) -> qiskit.QuantumCircuit:
+    """Return a copy of the given circuit without comments.
+
+    The comments do not act on any qubit, and Qiskit refuses to compile a
+    barrier without qubits, so a circuit has to be stripped before being
+    executed (see hhl4x4.utils.circuits.execute). The composite gates
+    containing comments are flattened in the returned circuit, the other
+    instructions are reapplied as they are.
+
+    :param circuit: the circuit to copy. It is not modified.
+    :return: a new circuit with the same name, registers and gates, but
+    without comments.
+    """
+    stripped = qiskit.QuantumCircuit(*circuit.regs.values(),
+                                     name=circuit.name)
+    for instruction in _instructions_without_comments(circuit.data):
+        instruction.reapply(stripped)
+    return stripped
 
 
 qiskit.QuantumCircuit.comment = comment
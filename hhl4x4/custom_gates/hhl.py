@@ -0,0 +1,160 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""This module contains functions to apply the HHL algorithm.
+
+The eigenvalue inversion implemented here is the one described in
+https://arxiv.org/abs/1110.2232v2 for the 4x4 matrix studied in the paper:
+the eigenvalues are inverted by swapping 2 qubits of the clock register
+before the controlled rotations. The swap is virtual: the rotations are
+controlled by the relabelled qubits (see PermutedQuantumRegister), so no SWAP
+gate is added to the circuit.
+"""
+import typing
+
+from qiskit import QuantumCircuit, QuantumRegister, CompositeGate
+from sympy import pi
+
+from hhl4x4.utils.endianness import QRegisterBE
+from hhl4x4.utils.registers import PermutedQuantumRegister
+import hhl4x4.custom_gates.comment
+import hhl4x4.custom_gates.inverse
+import hhl4x4.custom_gates.qpe
+
+QubitType = typing.Tuple[QuantumRegister, int]
+
+
+def eigenvalue_rotations(clock_quantum_register: QRegisterBE,
+                         r: float) -> typing.List[typing.Tuple[QubitType,
+                                                               float]]:
+    """Compute the rotations of the ancilla qubit controlled by the
+    eigenvalues.
+
+    :param clock_quantum_register: the clock register, as left by the quantum
+    phase estimation.
+    :param r: parameter of the controlled rotations.
+    :return: for each rotation, the control qubit and the angle of the RY
+    gate applied on the ancilla qubit.
+    """
+    n = len(clock_quantum_register)
+    # Relabelling the qubits is equivalent to swapping them before the
+    # rotations and swapping them back after.
+    qclock_inverted = PermutedQuantumRegister(clock_quantum_register)
+    qclock_inverted.swap_qubits(1, 2)
+    return [(qclock_inverted[n - 1 - i], 2 ** (n - i - r) * pi)
+            for i in range(n)]
+
+
+class HHLGate(CompositeGate):
+
+    def __init__(self, ancilla_quantum_register, clock_quantum_register,
+                 b_quantum_register, controlled_hamiltonian_powers,
+                 r: float = 6, qcirc: QuantumCircuit = None,
+                 qft_approximation: int = None):
+        """Initialize the HHLGate class.
+
+        The HHLGate applies the quantum phase estimation, the rotation
+        controlled by the eigenvalues and the uncomputation of the quantum
+        phase estimation. The preparation of |b> and the measurement of the
+        ancilla qubit are left to the caller.
+
+        :param ancilla_quantum_register: |0> state in input, the ancilla qubit
+        used to postselect the solution.
+        :param clock_quantum_register: |0>^n state in input and in output,
+        used to store the eigenvalues.
+        :param b_quantum_register: |b> state in input, |x> state in output
+        when the ancilla qubit is measured in the |1> state.
+        :param controlled_hamiltonian_powers: A callable that implements the
+        quantum circuits applying the controlled-U^{2^i} transformations. See
+        QuantumPhaseEstimationGate for more details.
+        :param r: parameter of the controlled rotations. A good value is
+        between 5 and 6 according to the article.
+        :param qcirc: The associated quantum circuit.
+        :param qft_approximation: The order of approximation of the inverse
+        quantum Fourier transform of the quantum phase estimation, see
+        QuantumPhaseEstimationGate.
+        """
+        qancilla = ancilla_quantum_register
+        qclock = clock_quantum_register
+        qb = b_quantum_register
+        used_qubits = [qancilla[i] for i in range(len(qancilla))] + \
+                      [qclock[i] for i in range(len(qclock))] + \
+                      [qb[i] for i in range(len(qb))]
+
+        super().__init__(self.__class__.__name__,  # name
+                         [r],  # parameters
+                         used_qubits,  # qubits
+                         qcirc)  # circuit
+
+        # 1. Quantum Phase Estimation
+        self.comment("[4x4] 1. Quantum phase estimation.")
+        qpe_gate = self.qpe(qclock, qb, controlled_hamiltonian_powers,
+                            approximation=qft_approximation)
+
+        ## 2. Phase rotation controlled by the eigenvalue.
+        self.comment("[4x4] Inverting computed eigenvalues.")
+        rotations = eigenvalue_rotations(qclock, r)
+
+        self.comment("[4x4] 2. Phase rotation.")
+
+        def cry(circuit, theta, ctrl, target):
+            circuit.comment("CRY")
+            # Apply the supposed c-RY operation.
+            circuit.cu3(theta, 0, 0, ctrl, target)
+
+        for control, theta in rotations:
+            cry(self, theta, control, qancilla[0])
+
+        ## 3. Uncompute the Quantum Phase Estimation.
+        self.comment("[4x4] 3. Inverting quantum phase estimation.")
+        self.inverse_of(qpe_gate)
+
+
+def hhl(self, ancilla_quantum_register: QRegisterBE,
+        clock_quantum_register: QRegisterBE,
+        b_quantum_register: QRegisterBE,
+        controlled_hamiltonian_powers: typing.Callable[
+            [int, CompositeGate, QubitType, QRegisterBE], None],
+        r: float = 6, qft_approximation: int = None) -> HHLGate:
+    self._check_qreg(ancilla_quantum_register)
+    self._check_qreg(clock_quantum_register)
+    self._check_qreg(b_quantum_register)
+    self._check_dups([ancilla_quantum_register, clock_quantum_register,
+                      b_quantum_register])
+    return self._attach(HHLGate(ancilla_quantum_register,
+                                clock_quantum_register, b_quantum_register,
+                                controlled_hamiltonian_powers, r, self,
+                                qft_approximation))
+
+
+QuantumCircuit.hhl = hhl
+CompositeGate.hhl = hhl
@@ -0,0 +1,99 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+"""This module contains a gate applying the inverse of an other gate.
+
+Inverting a CompositeGate with its inverse method modifies the gate in place,
+so a gate that is needed both as is and inverted (for example the quantum
+phase estimation and its uncomputation) used to be deep-copied before being
+inverted, copying every nested gate and register. The InverseGate shares the
+gate it inverts instead: its own gates are created only when they are first
+needed, nested composite gates being themselves wrapped in an InverseGate.
+"""
+
+import copy
+import typing
+
+from qiskit import QuantumCircuit, CompositeGate, Instruction
+
+
+def _inverse_instruction(instruction: Instruction,
+                         circuit: QuantumCircuit) -> Instruction:
+    """Return the inverse of the given instruction without modifying it."""
+    if isinstance(instruction, CompositeGate):
+        return InverseGate(instruction, circuit)
+    # The inverse method of the basic gates modifies their parameters in
+    # place, so only the parameter list needs to be copied.
+    instruction_copy = copy.copy(instruction)
+    instruction_copy.param = list(instruction.param)
+    return instruction_copy.inverse()
+
+
+class InverseGate(CompositeGate):
+    """Inverse of an existing gate, sharing the gates of the inverted gate.
+
+    The inverted gate should not be modified after the creation of the
+    InverseGate.
+    """
+
+    def __init__(self, gate: CompositeGate, circuit: QuantumCircuit = None):
+        """Initialize the InverseGate class.
+
+        :param gate: The gate to invert. It is not modified.
+        :param circuit: The associated quantum circuit.
+        """
+        super().__init__(gate.name + "_dg",  # name
+                         gate.param,  # parameters
+                         gate.arg,  # qubits
+                         circuit)  # circuit
+        self.gate = gate
+        # The gates are computed on the first access to self.data.
+        self._data = None
+
+    @property
+    def data(self) -> typing.List[Instruction]:
+        if self._data is None:
+            self._data = [_inverse_instruction(instruction, self.circuit)
+                          for instruction in reversed(self.gate.data)]
+        return self._data
+
+    @data.setter
+    def data(self, value: typing.List[Instruction]):
+        self._data = value
+
+
+def inverse_of(self, gate: CompositeGate) -> InverseGate:
+    """Add the inverse of the given gate, which is not modified."""
+    return self._attach(InverseGate(gate, self))
+
+
+QuantumCircuit.inverse_of = inverse_of
+CompositeGate.inverse_of = inverse_of
@@ -178,11 +178,11 @@ def apply_in_approx_fourier_basis(self, operation, qreg: QRegisterBase,
 
     # Defining first our big endian operation.
     def big_endian_operation(self_local, qreg_local):
-        # Here, 'self' and 'qreg' refer to the local parameters,
+        # Here, 'self_local' and 'qreg_local' refer to the local parameters,
         # 'qcirc', 'kwargs' and 'approximation' refer to the parameters
         # of the parent scope.
-        approximate_qft_be(self, qreg, qcirc, approximation)
-        operation(self, qreg, **kwargs)
-        iapproximate_qft_be(self, qreg, qcirc, approximation)
+        approximate_qft_be(self_local, qreg_local, qcirc, approximation)
+        operation(self_local, qreg_local, **kwargs)
+        iapproximate_qft_be(self_local, qreg_local, qcirc, approximation)
 
     apply_BE_operation(self, big_endian_operation, qreg)
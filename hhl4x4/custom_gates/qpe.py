@@ -31,11 +31,20 @@
 
 """This module contains functions to apply the quantum phase estimation
 algorithm.
+
+The iterative_qpe function implements a measurement-based variant: the
+inverse quantum Fourier transform is replaced by its semiclassical version
+(Griffiths and Niu, https://arxiv.org/abs/quant-ph/9511007), in which each
+controlled phase gate becomes a phase gate conditioned by a measured bit.
+The bits of the phase are then measured one after the other on a single
+clock qubit, which is reset and reused for each bit.
 """
 import typing
-from qiskit import QuantumCircuit, QuantumRegister, CompositeGate
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, \
+    CompositeGate
+from sympy import pi
 from hhl4x4.utils.endianness import QRegisterBE
-from hhl4x4.custom_gates.qft import iqft_be
+from hhl4x4.custom_gates.qft import iapproximate_qft_be
 
 import hhl4x4.custom_gates.comment
 
@@ -46,7 +55,7 @@ class QuantumPhaseEstimationGate(CompositeGate):
 
     def __init__(self, phase_quantum_register, eigenvector_quantum_register,
                  controlled_hamiltonian_powers, precision: float = 0.1,
-                 qcirc=None):
+                 qcirc=None, approximation: int = None):
         """Initialize the QuantumPhaseEstimationGate class.
 
         Apply the Quantum Phase Estimation algorithm to estimate the eigenvalue
@@ -63,6 +72,9 @@ class QuantumPhaseEstimationGate(CompositeGate):
         'quantum_register', controlled by the qubit 'control'.
         :param precision:
         :param qcirc: The associated quantum circuit.
+        :param approximation: The order of approximation of the inverse
+        quantum Fourier transform, see ApproximateQFTGate. If not present,
+        ceil(log2(n)) + 2 is used, which is exact for n <= 4.
         """
 
         n, m = len(phase_quantum_register), len(eigenvector_quantum_register)
@@ -89,7 +101,8 @@ class QuantumPhaseEstimationGate(CompositeGate):
                 "[QPE] 2.{0}. End of step {0} of phase estimation.".format(i))
 
         self.comment("[QPE] 3. Inverse QFT.")
-        iqft_be(self, phase_quantum_register, qcirc)
+        iapproximate_qft_be(self, phase_quantum_register, qcirc,
+                            approximation)
         self.comment("[QPE] End block.")
 
 
@@ -97,15 +110,66 @@ def qpe(self, phase_quantum_register: QRegisterBE,
         eigenvector_quantum_register: QRegisterBE,
         controlled_hamiltonian_powers: typing.Callable[
             [int, CompositeGate, QubitType, QRegisterBE], None],
-        precision: float = 0.1) -> QuantumPhaseEstimationGate:
+        precision: float = 0.1,
+        approximation: int = None) -> QuantumPhaseEstimationGate:
     self._check_qreg(phase_quantum_register)
     self._check_qreg(eigenvector_quantum_register)
     self._check_dups([phase_quantum_register, eigenvector_quantum_register])
     return self._attach(QuantumPhaseEstimationGate(phase_quantum_register,
                                                    eigenvector_quantum_register,
                                                    controlled_hamiltonian_powers,
-                                                   precision, self))
+                                                   precision, self,
+                                                   approximation))
+
+
+def iterative_qpe(self, clock_qubit: QubitType,
+                  eigenvector_quantum_register: QRegisterBE,
+                  controlled_hamiltonian_powers: typing.Callable[
+                      [int, CompositeGate, QubitType, QRegisterBE], None],
+                  phase_classical_registers: typing.Sequence[
+                      ClassicalRegister]):
+    """Apply the iterative quantum phase estimation.
+
+    The bits of the phase are measured from the least significant one: the
+    bit k is measured on clock_qubit after a controlled-U^{2^(n-1-k)} and
+    phase gates conditioned by the bits already measured, which replace the
+    controlled phase gates of the inverse quantum Fourier transform. At the
+    end, the phase is sum_k bit_k 2^k / 2^n.
+    As the clock qubit is measured, the eigenvector register is projected on
+    one of the eigenvectors. This is a sampling-only version of the quantum
+    phase estimation, which can not be uncomputed.
+
+    :param self: the quantum circuit. The reset and measure instructions are
+    not available in composite gates.
+    :param clock_qubit: the qubit used to measure each bit of the phase.
+    :param eigenvector_quantum_register: |psi> state, an eigenvector of U,
+    in input.
+    :param controlled_hamiltonian_powers: A callable that implements the
+    quantum circuits applying the controlled-U^{2^i} transformations. See
+    QuantumPhaseEstimationGate for more details.
+    :param phase_classical_registers: n registers of 1 bit, the register k
+    receiving the bit k of the phase. One register per bit is needed because
+    the phase gates are conditioned by the value of a whole register.
+    """
+    n = len(phase_classical_registers)
+    self.comment("[IQPE] Starting block.")
+    for k in range(n):
+        self.comment("[IQPE] Measuring the bit {} of the phase.".format(k))
+        if k > 0:
+            self.reset(clock_qubit)
+        self.h(clock_qubit)
+        controlled_hamiltonian_powers(n - 1 - k, self, clock_qubit,
+                                      eigenvector_quantum_register)
+        # Semiclassical inverse QFT: remove the contribution of the bits
+        # already measured from the phase.
+        for j in range(k):
+            self.u1(-pi / 2 ** (k - j), clock_qubit).c_if(
+                phase_classical_registers[j], 1)
+        self.h(clock_qubit)
+        self.measure(clock_qubit, phase_classical_registers[k][0])
+    self.comment("[IQPE] End block.")
 
 
 QuantumCircuit.qpe = qpe
 CompositeGate.qpe = qpe
+QuantumCircuit.iterative_qpe = iterative_qpe
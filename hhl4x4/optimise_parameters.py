@@ -50,11 +50,96 @@ import numpy as np
 import scipy.linalg as la
 
 import hhl4x4.custom_gates.hhl4x4
+from hhl4x4.utils.circuits import execute
+from hhl4x4.utils.unitaries import hamiltonian4x4_unitary, \
+    hamiltonian4x4_derivatives
 
 QubitType = typing.Tuple[qiskit.QuantumRegister, int]
 
+A = .25 * np.array(
+    [[15, 9, 5, -3], [9, 15, 3, -5], [5, 3, 15, -9], [-3, -5, -9, 15]])
 
-def hamiltonian_error(power: int, display_digit: int):
+
+def swap(U):
+    """Change the quantum gate representation.
+
+    Qiskit uses a different endianness which change the unitary matrices
+    representing quantum gates. This function takes a quantum gate "as
+    we are used to represent them" and transform it "as Qiskit
+    represents them".
+
+    :param U: the matrix to change.
+    :return: the adapted matrix.
+    """
+    from copy import deepcopy
+    cpy = deepcopy(U)
+    cpy[[1, 2], :] = cpy[[2, 1], :]
+    cpy[:, [1, 2]] = cpy[:, [2, 1]]
+    return cpy
+
+
+_target_unitaries = dict()
+
+
+def target_unitary(power: int, matrix: np.ndarray = A) -> np.ndarray:
+    """Compute the ideal unitary matrix exp(-i A t0 2^power / 16).
+
+    The matrices are cached: U^{2^power} is computed by squaring the cached
+    U^{2^(power-1)}, so computing the matrices of all the powers of a clock
+    register costs one matrix exponential.
+
+    :param power: the power we want to simulate.
+    :param matrix: the matrix of the simulated Hamiltonian. Default to A.
+    :return: the unitary matrix, "as we are used to represent them" (see
+    swap).
+    """
+    key = (power, matrix.shape, matrix.tobytes())
+    if key not in _target_unitaries:
+        if power == 0:
+            t0 = 2 * np.pi
+            _target_unitaries[key] = la.expm(-1.j * matrix * t0 / 16)
+        else:
+            previous = target_unitary(power - 1, matrix)
+            _target_unitaries[key] = previous @ previous
+    return _target_unitaries[key]
+
+
+def simulated_unitary(params: typing.Sequence[float]) -> np.ndarray:
+    """Compute the unitary matrix of the inverse Hamiltonian4x4Gate with Aer.
+
+    :param params: parameters used in the quantum circuit.
+    :return: the 8x8 unitary matrix returned by the unitary simulator.
+    """
+    ancilla = qiskit.QuantumRegister(1)
+    b = qiskit.QuantumRegister(2)
+    classical = qiskit.ClassicalRegister(1)
+
+    circuit = qiskit.QuantumCircuit(ancilla, b, classical)
+
+    circuit.hamiltonian4x4(ancilla[0], b, params).inverse()
+
+    unitary_sim = qiskit.Aer.get_backend('unitary_simulator')
+    res = execute([circuit], unitary_sim).result()
+    return res.get_unitary(circuit)
+
+
+def numpy_unitary(params: typing.Sequence[float]) -> np.ndarray:
+    """Compute the unitary matrix of the inverse Hamiltonian4x4Gate.
+
+    The matrix is the same as the one returned by simulated_unitary, but it is
+    computed from the closed-form matrices of the gates, without building
+    nor simulating any quantum circuit.
+
+    :param params: parameters used in the quantum circuit.
+    :return: the 8x8 unitary matrix.
+    """
+    return hamiltonian4x4_unitary(params).conj().T
+
+
+def hamiltonian_error(power: int, display_digit: typing.Optional[int],
+                      use_simulator: bool = False,
+                      with_gradient: bool = False,
+                      matrix: np.ndarray = A):
     """Generate and return a function that will be given to the optimiser.
 
     The returned function will compute the error between the ideal unitary
@@ -62,7 +147,18 @@ def hamiltonian_error(power: int, display_digit: int):
     a parameters given by the optimizer.https://arxiv.org/abs/1110.2232v2
 
     :param power: the power we want to simulate.
+    :param display_digit: number of digits used to display the parameters.
+    If None, nothing is displayed.
+    :param use_simulator: if True, the unitary matrix is computed with the
+    Aer unitary simulator instead of the closed-form gate matrices.
+    :param with_gradient: if True, the returned function also returns the
+    exact gradient of the error, computed from the closed-form gate
+    matrix. The function can then be given to scipy.optimize.minimize
+    with jac=True.
+    :param matrix: the matrix of the simulated Hamiltonian. Default to A.
     """
+    expA = swap(target_unitary(power, matrix))
+    compute_unitary = simulated_unitary if use_simulator else numpy_unitary
 
     def ret(params: typing.Sequence[float]) -> float:
         """Computes the error between the ideal matrix and the simulated one.
@@ -71,57 +167,141 @@ def hamiltonian_error(power: int, display_digit: int):
         :return: the 2-norm distance between the ideal matrix and the simulated
         one.
         """
-        list_format = ','.join(
-            ["{: ." + str(display_digit) + "f}" for i in range(len(params))])
-        print(("Computing U^{:<2} error with [" + list_format + "]: ").format(
-            2 ** power, *params), end='')
-
-        def swap(U):
-            """Change the quantum gate representation.
-
-            Qiskit uses a different endianness which change the unitary matrices
-            representing quantum gates. This function takes a quantum gate "as
-            we are used to represent them" and transform it "as Qiskit
-            represents them".
-
-            :param U: the matrix to change.
-            :return: the adapted matrix.
-            """
-            from copy import deepcopy
-            cpy = deepcopy(U)
-            cpy[[1, 2], :] = cpy[[2, 1], :]
-            cpy[:, [1, 2]] = cpy[:, [2, 1]]
-            return cpy
-
-        ancilla = qiskit.QuantumRegister(1)
-        b = qiskit.QuantumRegister(2)
-        classical = qiskit.ClassicalRegister(1)
-
-        circuit = qiskit.QuantumCircuit(ancilla, b, classical)
-
-        circuit.hamiltonian4x4(ancilla[0], b, params).inverse()
-
-        unitary_sim = qiskit.Aer.get_backend('unitary_simulator')
-        res = qiskit.execute([circuit], unitary_sim).result()
-        unitary = res.get_unitary()
-
-        A = .25 * np.array(
-            [[15, 9, 5, -3], [9, 15, 3, -5], [5, 3, 15, -9], [-3, -5, -9, 15]])
-        t0 = 2 * np.pi
-        expA = swap(la.expm(-1.j * A * t0 * (2 ** power / 16)))
-        unit = unitary[1::2, 1::2]
-        np.set_printoptions(precision=2)
+        if display_digit is not None:
+            list_format = ','.join(["{: ." + str(display_digit) + "f}"
+                                    for i in range(len(params))])
+            print(("Computing U^{:<2} error with [" + list_format +
+                   "]: ").format(2 ** power, *params), end='')
+
+        if with_gradient and not use_simulator:
+            unitary, derivatives = hamiltonian4x4_derivatives(params)
+            # The gate is inverted: its matrix is the adjoint of "unitary".
+            unit = unitary.conj().T
+        else:
+            unit = compute_unitary(params)[1::2, 1::2]
         err = la.norm(unit - expA)
-        print("{: g}".format(err), end='\r', flush=True)
-        return err
+        if display_digit is not None:
+            print("{: g}".format(err), end='\r', flush=True)
+        if not with_gradient:
+            return err
+
+        if use_simulator:
+            _, derivatives = hamiltonian4x4_derivatives(params)
+        # d||D|| = Re(<D, dD>) / ||D||, the derivative of the adjoint being
+        # the adjoint of the derivative.
+        difference = unit - expA
+        gradient = np.array([np.vdot(difference, derivative.conj().T).real
+                             for derivative in derivatives]) / err
+        return err, gradient
 
     return ret
 
 
+DEFAULT_INITIAL_PARAMETERS = [0.2, 0.38, 0.98, 1.88, 0.59]
+
+# Parameters of Hamiltonian4x4Gate simulating U^{2^power} for the matrix A,
+# keyed by power. They were obtained with this script and their errors are
+# below 1e-7.
+KNOWN_PARAMETERS = {
+    0: [0.19634953, 0.37900987, 0.9817477, 1.87900984, 0.58904862],
+    1: [1.9634954, 1.11532058, 1.9634954, 2.61532069, 1.17809726],
+    2: [-0.78539816, 1.01714584, 3.92699082, 2.51714589, 2.35619449],
+    3: [-9.01416169e-09, -0.750000046, 1.57079632, 0.750000039, -1.57079633],
+}
+
+
+def optimise_power(power: int, initial_parameters: typing.Sequence[float],
+                   maxiter: int = 1000, display_digit: int = None,
+                   use_simulator: bool = False,
+                   matrix: np.ndarray = A) -> typing.Dict:
+    """Optimise the parameters of the Hamiltonian simulation for U^{2^power}.
+
+    :param power: the power we want to simulate.
+    :param initial_parameters: the starting point of the optimiser.
+    :param maxiter: maximum number of iterations of the optimiser.
+    :param display_digit: number of digits used to display the parameters
+    during the optimisation. If None, nothing is displayed.
+    :param use_simulator: if True, the unitary matrices are computed with the
+    Aer unitary simulator.
+    :param matrix: the matrix of the simulated Hamiltonian. Default to A.
+    :return: a dictionary describing the optimised parameters.
+    """
+    import scipy.optimize as opt
+
+    opt_res = opt.minimize(hamiltonian_error(power, display_digit,
+                                             use_simulator,
+                                             with_gradient=True,
+                                             matrix=matrix),
+                           initial_parameters, jac=True,
+                           options={"maxiter": maxiter})
+    return {"power": 2 ** power,
+            "parameters": opt_res.x.tolist(),
+            "error": float(opt_res.fun),
+            "iterations": int(opt_res.nit),
+            "initial_parameters": list(initial_parameters)}
+
+
+def optimise_powers(powers: typing.Iterable[int], restarts: int = 0,
+                    processes: int = None, maxiter: int = 1000,
+                    seed: int = None, use_simulator: bool = False,
+                    display_digit: int = None) -> typing.List[typing.Dict]:
+    """Optimise the parameters of the Hamiltonian simulation for several powers.
+
+    Each power is optimised from DEFAULT_INITIAL_PARAMETERS and from
+    "restarts" random starting points. All the optimisations are
+    independent and run concurrently in a pool of processes.
+
+    :param powers: the powers we want to simulate, U^{2^power} being
+    simulated for each given power.
+    :param restarts: number of additional random starting points per power.
+    :param processes: number of worker processes. Default to the number of
+    CPUs. If 1, the optimisations are run in the current process.
+    :param maxiter: maximum number of iterations of each optimisation.
+    :param seed: seed of the random starting points.
+    :param use_simulator: if True, the unitary matrices are computed with the
+    Aer unitary simulator.
+    :param display_digit: number of digits used to display the parameters
+    during the optimisations. Only used if processes is 1.
+    :return: for each power, the description of the best parameters found
+    (see optimise_power).
+    """
+    powers = list(powers)
+    random_state = np.random.RandomState(seed)
+    tasks = []
+    for power in powers:
+        tasks.append((power, DEFAULT_INITIAL_PARAMETERS))
+        tasks.extend((power, random_state.uniform(-np.pi, np.pi, 5).tolist())
+                     for _ in range(restarts))
+
+    if processes == 1:
+        results = []
+        for power, initial_parameters in tasks:
+            results.append(optimise_power(power, initial_parameters, maxiter,
+                                          display_digit, use_simulator))
+            if display_digit is not None:
+                print()
+    else:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            futures = [executor.submit(optimise_power, power,
+                                       initial_parameters, maxiter, None,
+                                       use_simulator)
+                       for power, initial_parameters in tasks]
+            results = [future.result() for future in futures]
+
+    best_results = dict()
+    for result in results:
+        power = result["power"]
+        if power not in best_results or \
+                result["error"] < best_results[power]["error"]:
+            best_results[power] = result
+    return [best_results[2 ** power] for power in powers]
+
+
 def main():
     # Optimise!
-    import scipy.optimize as opt
     import argparse
+    import json
 
     parser = argparse.ArgumentParser(
         description='Find the optimum parameters for Hamiltonian simulation.')
@@ -132,13 +312,33 @@ def main():
     parser.add_argument("--display-precision", type=int, default=8,
                         help="Number of digits needed when the parameters are "
                              "displayed (default to 8).")
+    parser.add_argument("--use-simulator", action="store_true",
+                        help="Compute the unitary matrices with the Aer "
+                             "unitary simulator instead of NumPy.")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Number of worker processes (default to the "
+                             "number of CPUs). With 1 process, the "
+                             "optimisation progress is displayed.")
+    parser.add_argument("--restarts", type=int, default=0,
+                        help="Number of additional random starting points "
+                             "for each power (default to 0).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the random starting points.")
+    parser.add_argument("--output", type=str, default=None,
+                        help="File where the JSON table of the best "
+                             "parameters is written (default to the "
+                             "standard output).")
     args = parser.parse_args()
 
-    for power in range(4):
-        opt_res = opt.minimize(hamiltonian_error(power, args.display_precision),
-                               [0.2, 0.38, 0.98, 1.88, 0.59],
-                               options={"maxiter": args.maxiter})
-        print()
+    results = optimise_powers(range(4), args.restarts, args.processes,
+                              args.maxiter, args.seed, args.use_simulator,
+                              args.display_precision)
+    table = json.dumps(results, indent=4)
+    if args.output is None:
+        print(table)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(table)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,359 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+"""Estimate the solution of the linear system by sampling the HHL circuit.
+
+Without access to the statevector, the solution |x> is estimated from the
+measurements of the circuit: the shots with the ancilla qubit measured in the
+state |1> (and the clock register in the state |0>) are kept and the
+frequency of each outcome of the |b> register estimates the squared modulus
+of the corresponding component of |x>.
+
+The shots are run in batches. After each batch, a Wilson confidence interval
+is computed for each component and the sampling stops as soon as all the
+intervals are small enough. The size of the next batch is predicted from the
+current estimates, so easy instances do not waste a fixed huge number of
+shots.
+
+sample_eigenvalues estimates the eigenvalues of A, weighted by the
+decomposition of |b> on the eigenvectors, with the iterative quantum phase
+estimation, which only needs one clock qubit.
+
+The success probability of the HHL circuit is small, so most of the shots are
+discarded. sample_amplified_solution first amplifies the amplitude of the
+success branch (see hhl4x4.custom_gates.amplification) to keep almost all
+the shots.
+"""
+
+import math
+import typing
+
+import numpy as np
+import qiskit
+import scipy.stats
+
+import hhl4x4.utils.endianness as endian
+import hhl4x4.utils.peephole as peephole
+from hhl4x4.solver import controlled_hamiltonian_powers
+from hhl4x4.custom_gates.amplification import optimal_rounds
+from hhl4x4.utils.circuits import execute, snapshot
+import hhl4x4.custom_gates.qpe
+
+QubitType = typing.Tuple[qiskit.QuantumRegister, int]
+
+# Called with a number of shots, returns the number of accepted shots for
+# each component of the solution and the number of shots actually run.
+Sampler = typing.Callable[[int], typing.Tuple[np.ndarray, int]]
+
+
+def wilson_interval(counts: np.ndarray, total: int,
+                    confidence: float = 0.95) -> typing.Tuple[np.ndarray,
+                                                              np.ndarray]:
+    """Compute the Wilson score intervals of binomial proportions.
+
+    :param counts: the number of successes of each proportion.
+    :param total: the number of trials.
+    :param confidence: the confidence level of the intervals.
+    :return: the lower and the upper bounds of the intervals.
+    """
+    counts = np.asarray(counts, dtype=float)
+    if total == 0:
+        return np.zeros_like(counts), np.ones_like(counts)
+    z = scipy.stats.norm.ppf(0.5 + confidence / 2)
+    proportions = counts / total
+    denominator = 1 + z ** 2 / total
+    centre = (proportions + z ** 2 / (2 * total)) / denominator
+    half_width = z / denominator * np.sqrt(
+        proportions * (1 - proportions) / total + z ** 2 / (4 * total ** 2))
+    return np.clip(centre - half_width, 0, 1), np.clip(centre + half_width, 0,
+                                                       1)
+
+
+def _required_accepted_shots(probabilities: np.ndarray, target_error: float,
+                             confidence: float) -> int:
+    """Predict the number of accepted shots needed to estimate the modulus of
+    each component with the target error.
+
+    The variance of sqrt(p) estimated from n accepted shots is about
+    (1 - p) / (4 n).
+    """
+    z = scipy.stats.norm.ppf(0.5 + confidence / 2)
+    return math.ceil(z ** 2 * np.max(1 - probabilities) /
+                     (4 * target_error ** 2))
+
+
+def estimate_amplitudes(sample: Sampler, components: int,
+                        target_error: float = 0.02,
+                        confidence: float = 0.95,
+                        initial_shots: int = 1024,
+                        max_shots: int = 10 ** 7) -> typing.Dict:
+    """Estimate the moduli of the components of a postselected state.
+
+    :param sample: the function running the shots, see Sampler.
+    :param components: the number of components of the estimated state.
+    :param target_error: the sampling stops when the half-width of the
+    confidence interval of the modulus of each component is below this value.
+    :param confidence: the confidence level of the intervals.
+    :param initial_shots: the number of shots of the first batch.
+    :param max_shots: the sampling stops when this number of shots is run,
+    even if the target error is not reached.
+    :return: a dictionary describing the estimation.
+    """
+    if initial_shots <= 0 or max_shots <= 0:
+        raise ValueError("The number of shots should be positive.")
+    counts = np.zeros(components, dtype=np.int64)
+    shots, batches = 0, 0
+    batch_shots = min(initial_shots, max_shots)
+    while batch_shots > 0:
+        batch_counts, batch_run = sample(batch_shots)
+        counts += batch_counts
+        shots += batch_run
+        batches += 1
+
+        accepted = int(counts.sum())
+        lower, upper = wilson_interval(counts, accepted, confidence)
+        half_widths = (np.sqrt(upper) - np.sqrt(lower)) / 2
+        error = float(np.max(half_widths))
+        if error <= target_error or shots >= max_shots:
+            break
+
+        # Predict the shots still needed from the current estimates, without
+        # more than doubling the total number of shots at each batch.
+        probabilities = counts / max(accepted, 1)
+        acceptance_rate = max(accepted, 1) / shots
+        missing = _required_accepted_shots(probabilities, target_error,
+                                           confidence) - accepted
+        batch_shots = math.ceil(1.1 * max(missing, 1) / acceptance_rate)
+        batch_shots = max(initial_shots, min(batch_shots, shots))
+        batch_shots = min(batch_shots, max_shots - shots)
+
+    accepted = int(counts.sum())
+    return {"solution": np.sqrt(counts / max(accepted, 1)),
+            "half_widths": half_widths,
+            "error": error,
+            "converged": error <= target_error,
+            "shots": shots,
+            "accepted_shots": accepted,
+            "batches": batches,
+            "success_probability": accepted / shots}
+
+
+def measurement_circuit(circuit: qiskit.QuantumCircuit,
+                        qancilla: qiskit.QuantumRegister,
+                        qclock: qiskit.QuantumRegister,
+                        qb: qiskit.QuantumRegister) -> typing.Tuple[
+    qiskit.QuantumCircuit, qiskit.ClassicalRegister]:
+    """Add the measurements of all the qubits to a snapshot of the circuit.
+
+    The ancilla qubit is stored in the bit 0 of the returned classical
+    register, the clock register in the next bits and the b register in the
+    last bits, each qubit at the position it has in its register.
+    """
+    classical = qiskit.ClassicalRegister(
+        len(qancilla) + len(qclock) + len(qb), "measures")
+    measured = snapshot(circuit, classical)
+    offset = 0
+    for register in (qancilla, qclock, qb):
+        for i in range(len(register)):
+            # The physical position of the qubit does not depend on the
+            # current endianness of the register.
+            qubit = register[i]
+            measured.measure(qubit, classical[offset + qubit[1]])
+        offset += len(register)
+    return measured, classical
+
+
+def sample_solution(circuit: qiskit.QuantumCircuit,
+                    qancilla: qiskit.QuantumRegister,
+                    qclock: qiskit.QuantumRegister,
+                    qb: qiskit.QuantumRegister,
+                    backend=None, seed: int = None,
+                    postselect_clock: bool = True,
+                    **kwargs) -> typing.Dict:
+    """Estimate the solution computed by an HHL circuit by sampling it.
+
+    :param circuit: the HHL circuit, without measurement. It is not modified.
+    :param qancilla: the ancilla register, the shots with the ancilla qubit
+    in the state |1> are kept.
+    :param qclock: the clock register.
+    :param qb: the register storing the solution.
+    :param backend: the backend running the shots. Default to the Aer
+    qasm_simulator.
+    :param seed: seed of the simulator. Each batch uses a different seed.
+    :param postselect_clock: if True, only the shots with the clock register
+    in the state |0> are kept.
+    :param kwargs: forwarded to estimate_amplitudes.
+    :return: the estimation, see estimate_amplitudes. The "solution" entry
+    contains the estimated moduli of the components of |x>, the component i
+    being the outcome i of the b register (the first qubit of qb being the
+    least significant bit).
+    """
+    if backend is None:
+        backend = qiskit.Aer.get_backend('qasm_simulator')
+    measured, _ = measurement_circuit(circuit, qancilla, qclock, qb)
+    b_offset = len(qancilla) + len(qclock)
+    clock_mask = (2 ** len(qclock) - 1) << len(qancilla)
+    batch_seeds = iter(range(seed, seed + 2 ** 31)) if seed is not None \
+        else None
+
+    def sample(shots: int) -> typing.Tuple[np.ndarray, int]:
+        batch_seed = next(batch_seeds) if batch_seeds is not None else None
+        result = execute([measured], backend, shots=shots,
+                         seed=batch_seed).result()
+        counts = np.zeros(2 ** len(qb), dtype=np.int64)
+        for key, count in result.get_counts(measured).items():
+            outcome = int(key.replace(" ", ""), 2)
+            # The ancilla register contains only one qubit.
+            if not outcome & 1:
+                continue
+            if postselect_clock and outcome & clock_mask:
+                continue
+            counts[outcome >> b_offset] += count
+        return counts, shots
+
+    return estimate_amplitudes(sample, 2 ** len(qb), **kwargs)
+
+
+def sample_amplified_solution(state_preparation: qiskit.CompositeGate,
+                              qancilla: qiskit.QuantumRegister,
+                              qclock: qiskit.QuantumRegister,
+                              qb: qiskit.QuantumRegister,
+                              rounds: int = None,
+                              success_probability: float = None,
+                              pilot_shots: int = 1024,
+                              backend=None, seed: int = None,
+                              postselect_clock: bool = True,
+                              **kwargs) -> typing.Dict:
+    """Estimate the solution by sampling an amplified HHL circuit.
+
+    :param state_preparation: the gate preparing |b> and applying the HHL
+    algorithm, on all the qubits of qancilla, qclock and qb, starting from
+    the state |0...0>. It is not modified.
+    :param qancilla: the ancilla register.
+    :param qclock: the clock register.
+    :param qb: the register storing the solution.
+    :param rounds: the number of rounds of amplitude amplification. If None,
+    it is computed with optimal_rounds from success_probability.
+    :param success_probability: the probability to measure the ancilla qubit
+    in the state |1> without amplification. If None and rounds is None, it is
+    estimated with pilot_shots shots of the circuit without amplification.
+    :param pilot_shots: the number of shots used to estimate the success
+    probability.
+    :param backend: the backend running the shots. Default to the Aer
+    qasm_simulator.
+    :param seed: seed of the simulator.
+    :param postselect_clock: if True, only the shots with the clock register
+    in the state |0> are kept.
+    :param kwargs: forwarded to estimate_amplitudes.
+    :return: the estimation, see sample_solution, with the number of rounds
+    in the "rounds" entry. The "shots" entry includes the pilot shots and
+    the "success_probability" entry is the amplified one.
+    """
+    circuit = qiskit.QuantumCircuit(qancilla, qclock, qb)
+    circuit._attach(state_preparation)
+
+    used_pilot_shots = 0
+    if rounds is None:
+        if success_probability is None:
+            pilot = sample_solution(circuit, qancilla, qclock, qb, backend,
+                                    seed, postselect_clock=False,
+                                    initial_shots=pilot_shots,
+                                    max_shots=pilot_shots)
+            used_pilot_shots = pilot["shots"]
+            # Without any success, assume that the probability is below
+            # 1 / pilot_shots.
+            success_probability = max(pilot["success_probability"],
+                                      1 / pilot_shots)
+        rounds = optimal_rounds(success_probability)
+
+    circuit.amplify(state_preparation, qancilla[0], rounds)
+    circuit, _ = peephole.optimise(circuit, keep_comments=False)
+    estimation = sample_solution(circuit, qancilla, qclock, qb, backend,
+                                 seed, postselect_clock, **kwargs)
+    estimation["rounds"] = rounds
+    estimation["shots"] += used_pilot_shots
+    return estimation
+
+
+def sample_eigenvalues(clock_size: int = 4, shots: int = 1024,
+                       prepare_b: typing.Callable[
+                           [qiskit.QuantumCircuit, qiskit.QuantumRegister],
+                           None] = None,
+                       backend=None, seed: int = None) -> typing.Dict:
+    """Sample the eigenvalues of A with the iterative phase estimation.
+
+    The circuit only uses one clock qubit, reused for each of the clock_size
+    bits of the phase, and the b register: 3 qubits instead of the
+    clock_size + 3 qubits of the HHL circuit.
+
+    :param clock_size: number of bits of the estimated phases.
+    :param shots: the number of shots.
+    :param prepare_b: a callable preparing the state |b> on the given
+    register of the given circuit. Default to the uniform superposition.
+    :param backend: the backend running the shots. Default to the Aer
+    qasm_simulator.
+    :param seed: seed of the simulator.
+    :return: a dictionary with the estimated eigenvalues and their measured
+    frequencies, the number of shots and the number of simulated qubits.
+    """
+    if backend is None:
+        backend = qiskit.Aer.get_backend('qasm_simulator')
+    qclock = endian.QRegisterBE(qiskit.QuantumRegister(1))
+    qb = endian.QRegisterBE(qiskit.QuantumRegister(2))
+    phase_registers = [qiskit.ClassicalRegister(1, "phase{}".format(k))
+                       for k in range(clock_size)]
+    circuit = qiskit.QuantumCircuit(qclock, qb, *phase_registers)
+    if prepare_b is None:
+        circuit.h(qb)
+    else:
+        prepare_b(circuit, qb)
+    # |b> is encoded with qb[0] as the least significant qubit, as in
+    # hhl4x4.solver.solve, but the Hamiltonian simulation gates simulate A
+    # with their first target as the most significant qubit (see
+    # hhl4x4.optimise_parameters.swap). Without relabelling the qubits, the
+    # phases of the eigenvalues 2 and 4 would be exchanged.
+    endian.swap_endianness(circuit, qb, virtual=True)
+    circuit.iterative_qpe(qclock[0], qb, controlled_hamiltonian_powers,
+                          phase_registers)
+
+    result = execute([circuit], backend, shots=shots, seed=seed).result()
+    frequencies = dict()
+    for key, count in result.get_counts(circuit).items():
+        # The classical registers are printed from the last one to the
+        # first one.
+        bits = key.split()[::-1]
+        phase = sum(int(bit) << k for k, bit in enumerate(bits))
+        # U = exp(i A 2 pi / 16), so the phase of the eigenvalue l is l / 16.
+        eigenvalue = 16 * phase / 2 ** clock_size
+        frequencies[eigenvalue] = frequencies.get(eigenvalue, 0) + count / shots
+    return {"eigenvalues": frequencies,
+            "shots": shots,
+            "qubits": len(qclock) + len(qb)}
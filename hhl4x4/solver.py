@@ -0,0 +1,346 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Solve the 4x4 linear system of https://arxiv.org/abs/1110.2232v2 for many
+right-hand sides.
+
+The quantum circuit implemented by HHLGate is linear in its input state. This
+module simulates the circuit once for each vector of the canonical basis of
+the |b> register, all the simulations being dispatched in one Qiskit job, and
+then obtains the solution for any right-hand side with a matrix product
+instead of a new simulation. The linear map can also be extracted from the
+full unitary matrix of the circuit, which is cached on disk (see
+hhl_unitary).
+"""
+
+import typing
+
+import numpy as np
+import qiskit
+
+import hhl4x4.utils.endianness as endian
+import hhl4x4.utils.peephole as peephole
+import hhl4x4.utils.statevector as statevector_utils
+from hhl4x4.utils.circuits import execute
+from hhl4x4.utils.cache import cache_key, load_array, save_array, \
+    load_json, save_json, locked, default_cache_directory
+from hhl4x4.optimise_parameters import A, DEFAULT_INITIAL_PARAMETERS, \
+    KNOWN_PARAMETERS, hamiltonian_error, optimise_power
+import hhl4x4.custom_gates.comment
+import hhl4x4.custom_gates.hhl
+import hhl4x4.custom_gates.hhl4x4
+
+
+# Parameters already read from (or added to) the on-disk cache by this
+# process, keyed by the cache key, the tolerance and the cache directory.
+_hamiltonian_parameters = dict()
+
+
+def hamiltonian_parameters(power: int, tolerance: float = 1e-7,
+                           matrix: np.ndarray = A,
+                           cache_directory: str = None,
+                           max_restarts: int = 10) -> typing.List[float]:
+    """Return parameters of Hamiltonian4x4Gate simulating U^{2^power}.
+
+    For the matrix A, the parameters of KNOWN_PARAMETERS are returned if
+    their error is below the given tolerance. Otherwise, the parameters are
+    read from an on-disk cache keyed by the matrix and the power. If the
+    cache does not contain parameters with an error below the given
+    tolerance, they are computed with the optimiser of optimise_parameters.py
+    and added to the cache. The cache entry is locked during the
+    computation, so that concurrent processes compute it only once. The
+    parameters are then kept in memory, so the cache file is only read once
+    per process.
+
+    The optimiser is warm-started from the known parameters, if any, then
+    from the parameters of U^{2^(power-1)} (themselves obtained with this
+    function), which are much closer to the solution than a cold start as
+    U^{2^power} is the square of U^{2^(power-1)}.
+
+    :param power: the power we want to simulate.
+    :param tolerance: the maximum error (2-norm of the difference between
+    the unitary matrix of the quantum circuit and the true matrix).
+    :param matrix: the matrix of the simulated Hamiltonian.
+    :param cache_directory: the directory of the cache. Default to
+    hhl4x4.utils.cache.default_cache_directory().
+    :param max_restarts: number of random starting points tried by the
+    optimiser if the warm start and the default starting point do not reach
+    the tolerance.
+    :return: the 5 parameters of Hamiltonian4x4Gate.
+    """
+    key = cache_key("hamiltonian_parameters", matrix, power)
+    memo_key = (key, tolerance, cache_directory or default_cache_directory())
+    if memo_key not in _hamiltonian_parameters:
+        _hamiltonian_parameters[memo_key] = _load_or_compute_parameters(
+            key, power, tolerance, matrix, cache_directory, max_restarts)
+    return list(_hamiltonian_parameters[memo_key])
+
+
+def _load_or_compute_parameters(key: str, power: int, tolerance: float,
+                                matrix: np.ndarray, cache_directory: str,
+                                max_restarts: int) -> typing.List[float]:
+    """Read the parameters of U^{2^power} from the on-disk cache or compute
+    them, see hamiltonian_parameters."""
+
+    known_parameters = None
+    if np.array_equal(matrix, A):
+        known_parameters = KNOWN_PARAMETERS.get(power)
+    if known_parameters is not None and hamiltonian_error(
+            power, None, matrix=matrix)(known_parameters) <= tolerance:
+        return list(known_parameters)
+
+    def cached_parameters():
+        records = load_json(key, cache_directory) or []
+        for record in sorted(records, key=lambda record: record["error"]):
+            if record["error"] <= tolerance:
+                return record["parameters"]
+        return None
+
+    parameters = cached_parameters()
+    if parameters is not None:
+        return parameters
+
+    starting_points = [DEFAULT_INITIAL_PARAMETERS]
+    if power > 0:
+        starting_points.insert(0, hamiltonian_parameters(
+            power - 1, tolerance, matrix, cache_directory, max_restarts))
+    if known_parameters is not None:
+        starting_points.insert(0, list(known_parameters))
+    random_state = np.random.RandomState(power)
+    starting_points.extend(random_state.uniform(-np.pi, np.pi, 5).tolist()
+                           for _ in range(max_restarts))
+
+    with locked(key, cache_directory):
+        # An other process may have computed the parameters while we were
+        # waiting for the lock.
+        parameters = cached_parameters()
+        if parameters is not None:
+            return parameters
+
+        for initial_parameters in starting_points:
+            result = optimise_power(power, initial_parameters, matrix=matrix)
+            if result["error"] <= tolerance:
+                break
+        else:
+            raise RuntimeError("Could not find parameters simulating U^{} "
+                               "with an error below {} (best error: {})."
+                               "".format(2 ** power, tolerance,
+                                         result["error"]))
+        records = load_json(key, cache_directory) or []
+        records.append(result)
+        save_json(key, records, cache_directory)
+        return result["parameters"]
+
+
+def controlled_hamiltonian_powers(n: int, circuit, control, target):
+    """Apply the controlled-U^{2^n} transformation for the matrix A."""
+    # Previous method: just applying an optimized hamiltonian an exponential
+    # number of times.
+    # for i in range(2**n):
+    #     #circuit.hamiltonian4x4(control, target).inverse()
+    #     circuit.hamiltonian4x4(control, target)
+    circuit.hamiltonian4x4(control, target, hamiltonian_parameters(n))
+
+
+def create_registers(clock_size: int = 4):
+    """Create the quantum registers used by the HHL algorithm.
+
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :return: the ancilla, clock and b quantum registers, in this order.
+    """
+    qancilla = endian.QRegisterBE(qiskit.QuantumRegister(1))
+    qclock = endian.QRegisterBE(qiskit.QuantumRegister(clock_size))
+    qb = endian.QRegisterBE(qiskit.QuantumRegister(2))
+    return qancilla, qclock, qb
+
+
+def basis_circuits(r: float = 6, clock_size: int = 4) -> typing.List[
+    qiskit.QuantumCircuit]:
+    """Build one HHL circuit for each vector of the canonical basis of |b>.
+
+    The HHLGate is built and optimised (see hhl4x4.utils.peephole) only once
+    and its gates are shared by all the returned circuits, only the
+    preparation of |b> changes from one circuit to the other.
+
+    :param r: parameter of the controlled rotations.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :return: the list of circuits, the i-th circuit solving the system for the
+    i-th vector of the canonical basis.
+    """
+    qancilla, qclock, qb = create_registers(clock_size)
+    body = qiskit.QuantumCircuit(qancilla, qclock, qb)
+    body.hhl(qancilla, qclock, qb, controlled_hamiltonian_powers, r)
+    body, _ = peephole.optimise(body, keep_comments=False)
+    circuits = []
+    for index in range(2 ** len(qb)):
+        circuit = qiskit.QuantumCircuit(qancilla, qclock, qb)
+        circuit.comment("[4x4] Initialising b to the basis vector {}."
+                        "".format(index))
+        for i in range(len(qb)):
+            if (index >> i) & 1:
+                circuit.x(qb[i])
+        circuit.comment("[4x4] Initialisation done!")
+        for instruction in body.data:
+            circuit._attach(instruction)
+        circuits.append(circuit)
+    return circuits
+
+
+def hhl_unitary(r: float = 6, cache_directory: str = None,
+                use_cache: bool = True, clock_size: int = 4) -> np.ndarray:
+    """Compute the unitary matrix of the HHLGate.
+
+    The matrix only depends on A, r and the parameters of the Hamiltonian
+    simulation, so it is computed once with the unitary simulator and then
+    stored on disk.
+
+    :param r: parameter of the controlled rotations.
+    :param cache_directory: the directory of the cache. Default to
+    hhl4x4.utils.cache.default_cache_directory().
+    :param use_cache: if False, always compute the matrix and do not store it.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :return: the unitary matrix. Its rows and columns are ordered with the
+    ancilla qubit as the most significant bit, then the clock register and
+    then the b register.
+    """
+    qancilla, qclock, qb = create_registers(clock_size)
+    key = cache_key("hhl_unitary", A, r, len(qclock),
+                    [hamiltonian_parameters(n) for n in range(len(qclock))])
+    if use_cache:
+        unitary = load_array(key, cache_directory)
+        if unitary is not None:
+            return unitary
+
+    circuit = qiskit.QuantumCircuit(qancilla, qclock, qb)
+    circuit.hhl(qancilla, qclock, qb, controlled_hamiltonian_powers, r)
+    circuit, _ = peephole.optimise(circuit, keep_comments=False)
+    unitary_sim = qiskit.Aer.get_backend('unitary_simulator')
+    res_unitary = execute([circuit], unitary_sim).result()
+    unitary = np.asarray(res_unitary.get_unitary(circuit))
+
+    # Reorder the rows and the columns of the matrix like the statevectors.
+    register_sizes = [len(qancilla), len(qclock), len(qb)]
+    permutation = statevector_utils.reorder_registers(
+        np.arange(unitary.shape[0]), register_sizes)
+    unitary = unitary[np.ix_(permutation, permutation)]
+
+    if use_cache:
+        save_array(key, unitary, cache_directory)
+    return unitary
+
+
+def linear_map(r: float = 6, method: str = "statevector",
+               cache_directory: str = None,
+               clock_size: int = 4) -> np.ndarray:
+    """Compute the linear map applied by the HHL circuit on |b>.
+
+    :param r: parameter of the controlled rotations.
+    :param method: "statevector" to simulate the circuit for each vector of
+    the canonical basis of |b>, or "unitary" to extract the map from the
+    (cached) unitary matrix of the circuit, see hhl_unitary.
+    :param cache_directory: the directory of the cache, only used by the
+    "unitary" method.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :return: a matrix of shape (2 * 2**clock_size * 4, 4). The i-th column is
+    the final quantum state when |b> is the i-th vector of the canonical
+    basis. The rows are ordered with the ancilla qubit as the most significant
+    bit, then the clock register and then the b register.
+    """
+    if method == "unitary":
+        # The ancilla and clock registers start in the |0> state, so the
+        # map is given by the first columns of the unitary matrix.
+        return hhl_unitary(r, cache_directory, clock_size=clock_size)[:, :4]
+    elif method != "statevector":
+        raise ValueError("Unknown method: {}".format(method))
+
+    return simulate_basis_circuits(basis_circuits(r, clock_size))
+
+
+def simulate_basis_circuits(circuits: typing.List[qiskit.QuantumCircuit]
+                            ) -> np.ndarray:
+    """Compute the linear map applied by the HHL circuit from the circuits
+    returned by basis_circuits, with the statevector simulator.
+
+    :param circuits: the circuits returned by basis_circuits.
+    :return: the linear map, see linear_map.
+    """
+    state_sim = qiskit.Aer.get_backend('statevector_simulator')
+    res_state = execute(circuits, state_sim).result()
+    register_sizes = [len(register)
+                      for register in circuits[0].regs.values()
+                      if isinstance(register, qiskit.QuantumRegister)]
+    columns = [statevector_utils.reorder_registers(
+        np.asarray(res_state.get_statevector(circuit)), register_sizes)
+        for circuit in circuits]
+    return np.array(columns).T
+
+
+def solve(b_vectors: np.ndarray, r: float = 6, hhl_map: np.ndarray = None,
+          clock_size: int = 4) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Solve A x = b for each given right-hand side b.
+
+    :param b_vectors: an array of shape (k, 4), one right-hand side per row.
+    A 1-D array of size 4 is treated as a single right-hand side.
+    :param r: parameter of the controlled rotations. Ignored if hhl_map is
+    given.
+    :param hhl_map: the linear map returned by linear_map. If not given, it
+    is computed.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    Ignored if hhl_map is given.
+    :return: the normalised solutions, an array of shape (k, 4), and the
+    probabilities to measure the ancilla qubit in the |1> state, an array of
+    shape (k,).
+    :raise ValueError: if the right-hand sides do not have 4 components or if
+    some of them are zero vectors, which can not be encoded in a quantum
+    state.
+    """
+    b_vectors = np.atleast_2d(np.asarray(b_vectors, dtype=complex))
+    if b_vectors.ndim != 2 or b_vectors.shape[1] != 4:
+        raise ValueError("Expected right-hand sides of size 4, got an array "
+                         "of shape {}.".format(b_vectors.shape))
+    zero_rows = np.flatnonzero(~np.any(b_vectors, axis=1))
+    if zero_rows.size:
+        raise ValueError("The right-hand sides at the indices {} are zero "
+                         "vectors.".format(zero_rows.tolist()))
+    if hhl_map is None:
+        hhl_map = linear_map(r, clock_size=clock_size)
+
+    norms = np.linalg.norm(b_vectors, axis=1)
+    amplitudes = (b_vectors / norms[:, np.newaxis]) @ hhl_map.T
+    # Axes: right-hand side, ancilla, clock, b.
+    amplitudes = amplitudes.reshape((len(b_vectors), 2, -1, 4))
+
+    success_probabilities = np.sum(np.abs(amplitudes[:, 1]) ** 2,
+                                   axis=(1, 2))
+    solutions = amplitudes[:, 1, 0, :]
+    solutions = solutions / np.linalg.norm(solutions, axis=1)[:, np.newaxis]
+    return solutions, success_probabilities
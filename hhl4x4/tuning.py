@@ -0,0 +1,211 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+"""Choose the parameter r of the controlled rotations of the HHL algorithm.
+
+The controlled rotations apply RY(theta) on the ancilla qubit with
+theta = 2**(n - i - r) * pi for the i-th clock qubit, so r sets the
+probability to measure the ancilla qubit in the state |1> (the number of
+shots needed per solution) and the accuracy of the solution: a small r gives
+large angles and a high success probability, but sin(theta / 2) is then no
+longer proportional to the inverse of the eigenvalue.
+
+Only the rotations depend on r. The statevectors before the rotations are
+computed once from the unitary matrix of the quantum phase estimation,
+which is cached on disk, and each candidate value of r only applies the
+rotations and the uncomputation of the quantum phase estimation with NumPy.
+"""
+
+import typing
+
+import numpy as np
+import qiskit
+
+import hhl4x4.utils.peephole as peephole
+from hhl4x4.custom_gates.hhl import eigenvalue_rotations
+from hhl4x4.optimise_parameters import A
+from hhl4x4.solver import create_registers, controlled_hamiltonian_powers, \
+    hamiltonian_parameters
+from hhl4x4.utils.cache import cache_key, load_array, save_array
+from hhl4x4.utils.circuits import execute
+import hhl4x4.custom_gates.qpe
+
+
+_qpe_circuits = dict()
+
+
+def _qpe_circuit(clock_size: int):
+    """Build a circuit applying the quantum phase estimation of the HHL
+    algorithm on the clock and b registers.
+
+    The circuits are built once for each clock size. The returned registers
+    are in the state left by the quantum phase estimation.
+    """
+    if clock_size not in _qpe_circuits:
+        _, qclock, qb = create_registers(clock_size)
+        circuit = qiskit.QuantumCircuit(qclock, qb)
+        circuit.qpe(qclock, qb, controlled_hamiltonian_powers)
+        _qpe_circuits[clock_size] = (circuit, qclock, qb)
+    return _qpe_circuits[clock_size]
+
+
+def qpe_unitary(clock_size: int = 4, cache_directory: str = None,
+                use_cache: bool = True) -> np.ndarray:
+    """Compute the unitary matrix of the quantum phase estimation.
+
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :param cache_directory: the directory of the cache. Default to
+    hhl4x4.utils.cache.default_cache_directory().
+    :param use_cache: if False, always compute the matrix and do not store it.
+    :return: the unitary matrix, in Qiskit's order: the clock register is the
+    least significant part of the indices and the b register the most
+    significant one.
+    """
+    key = cache_key("qpe_unitary", A, clock_size,
+                    [hamiltonian_parameters(n) for n in range(clock_size)])
+    if use_cache:
+        unitary = load_array(key, cache_directory)
+        if unitary is not None:
+            return unitary
+
+    circuit, _, _ = _qpe_circuit(clock_size)
+    circuit, _ = peephole.optimise(circuit, keep_comments=False)
+    unitary_sim = qiskit.Aer.get_backend('unitary_simulator')
+    res_unitary = execute([circuit], unitary_sim).result()
+    unitary = np.asarray(res_unitary.get_unitary(circuit))
+
+    if use_cache:
+        save_array(key, unitary, cache_directory)
+    return unitary
+
+
+def rotation_amplitudes(r: float, clock_size: int = 4) -> np.ndarray:
+    """Compute the amplitude of the state |1> of the ancilla qubit after the
+    controlled rotations.
+
+    :param r: parameter of the controlled rotations.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :return: for each value of the clock register (the clock qubit i being
+    the bit i of the value), sin(theta / 2) with theta the sum of the angles
+    of the rotations controlled by the qubits in the state |1>.
+    """
+    _, qclock, _ = _qpe_circuit(clock_size)
+    values = np.arange(2 ** clock_size)
+    angles = np.zeros(2 ** clock_size)
+    # The controlled RY gates commute, so their angles add up.
+    for (_, qubit), theta in eigenvalue_rotations(qclock, r):
+        angles += float(theta) * ((values >> qubit) & 1)
+    return np.sin(angles / 2)
+
+
+def evaluate_r(r: float, pre_rotation_states: np.ndarray,
+               unitary: np.ndarray, exact_solutions: np.ndarray,
+               clock_size: int = 4) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Compute the success probabilities and the errors of the solutions
+    for a value of r.
+
+    :param r: parameter of the controlled rotations.
+    :param pre_rotation_states: the states of the clock and b registers
+    before the rotations, one column per right-hand side.
+    :param unitary: the unitary matrix of the quantum phase estimation, see
+    qpe_unitary.
+    :param exact_solutions: the normalised exact solutions, one row per
+    right-hand side.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :return: for each right-hand side, the probability to measure the
+    ancilla qubit in the state |1> and the 2-norm of the difference between
+    the normalised computed solution and the exact one (up to a global
+    phase).
+    """
+    amplitudes = np.tile(rotation_amplitudes(r, clock_size),
+                         len(unitary) // 2 ** clock_size)
+    # Part of the state with the ancilla qubit in the state |1>.
+    branches = amplitudes[:, np.newaxis] * pre_rotation_states
+    success_probabilities = np.sum(np.abs(branches) ** 2, axis=0)
+    final_states = unitary.conj().T @ branches
+    # Solutions are read with the clock register in the state |0>.
+    solutions = final_states[::2 ** clock_size].T
+    solutions = solutions / np.linalg.norm(solutions, axis=1)[:, np.newaxis]
+    overlaps = np.sum(exact_solutions.conj() * solutions, axis=1)
+    phases = overlaps / np.maximum(np.abs(overlaps), 1e-300)
+    errors = np.linalg.norm(solutions - phases[:, np.newaxis] *
+                            exact_solutions, axis=1)
+    return success_probabilities, errors
+
+
+def tune_r(b_vectors: np.ndarray = None, error_bound: float = 0.01,
+           candidates: typing.Iterable[float] = None, clock_size: int = 4,
+           cache_directory: str = None) -> typing.Dict:
+    """Choose the value of r maximising the success probability with an
+    error on the solutions below the given bound.
+
+    :param b_vectors: the right-hand sides, one per row. Default to the
+    uniform superposition prepared by 4x4.py.
+    :param error_bound: the maximum error on the normalised solutions.
+    :param candidates: the values of r to try. Default to the values between
+    2 and 10 with a step of 0.25.
+    :param clock_size: number of qubits used to store the eigenvalues.
+    :param cache_directory: the directory of the cache of qpe_unitary.
+    :return: a dictionary with the chosen value of r, its (worst case over
+    the right-hand sides) success probability and error, and the results of
+    all the candidates. If no candidate reaches the error bound, the one
+    with the smallest error is chosen.
+    """
+    if b_vectors is None:
+        b_vectors = np.full((1, 4), 0.5)
+    b_vectors = np.atleast_2d(np.asarray(b_vectors, dtype=complex))
+    b_vectors = b_vectors / np.linalg.norm(b_vectors, axis=1)[:, np.newaxis]
+    if candidates is None:
+        candidates = np.arange(2, 10.001, 0.25)
+
+    exact_solutions = np.linalg.solve(A, b_vectors.T).T
+    exact_solutions /= np.linalg.norm(exact_solutions, axis=1)[:, np.newaxis]
+
+    unitary = qpe_unitary(clock_size, cache_directory)
+    # The clock register starts in the state |0>: only the columns with the
+    # clock value 0 are needed.
+    pre_rotation_states = unitary[:, ::2 ** clock_size] @ b_vectors.T
+
+    results = []
+    for r in candidates:
+        success_probabilities, errors = evaluate_r(
+            r, pre_rotation_states, unitary, exact_solutions, clock_size)
+        results.append({"r": float(r),
+                        "success_probability": float(
+                            np.min(success_probabilities)),
+                        "error": float(np.max(errors))})
+
+    valid = [result for result in results if result["error"] <= error_bound]
+    if valid:
+        best = max(valid, key=lambda result: result["success_probability"])
+    else:
+        best = min(results, key=lambda result: result["error"])
+    return dict(best, candidates=results)
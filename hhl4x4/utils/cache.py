@@ -0,0 +1,196 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""This module contains the functions used to cache results on disk.
+
+Cached entries are identified by a key computed from the parameters that
+were used to compute them (see cache_key). The cache directory can be
+changed with the HHL4X4_CACHE_DIR environment variable.
+
+The cache can be shared between processes: entries are written atomically
+and the function locked can be used to compute an entry only once.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import typing
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows: the entries are still written atomically
+    # but concurrent processes may compute the same entry twice.
+    fcntl = None
+
+
+def default_cache_directory() -> str:
+    """Return the directory used to store the cached entries."""
+    return os.environ.get("HHL4X4_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache",
+                                       "hhl4x4"))
+
+
+def cache_key(*items) -> str:
+    """Compute a key identifying the given items.
+
+    :param items: numbers, strings, numpy arrays or (nested) sequences and
+    dictionaries of them.
+    :return: an hexadecimal digest of the items.
+    """
+    digest = hashlib.sha256()
+
+    def update(item):
+        if isinstance(item, dict):
+            digest.update(b"dict")
+            for key in sorted(item):
+                update(key)
+                update(item[key])
+        elif isinstance(item, (list, tuple)):
+            digest.update("seq{}".format(len(item)).encode())
+            for element in item:
+                update(element)
+        elif isinstance(item, np.ndarray):
+            digest.update("array{}{}".format(item.dtype, item.shape).encode())
+            digest.update(np.ascontiguousarray(item).tobytes())
+        else:
+            digest.update(repr(item).encode())
+
+    for item in items:
+        update(item)
+    return digest.hexdigest()
+
+
+def _entry_path(key: str, extension: str, cache_directory: str = None) -> str:
+    if cache_directory is None:
+        cache_directory = default_cache_directory()
+    return os.path.join(cache_directory, "{}.{}".format(key, extension))
+
+
+def _atomic_write(path: str, write: typing.Callable[[typing.IO], None]):
+    """Write a file atomically.
+
+    The file is first written to a temporary file which is then renamed, so
+    that concurrent readers never see a partially written file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(file_descriptor, "wb") as f:
+            write(f)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def load_array(key: str, cache_directory: str = None) -> typing.Optional[
+    np.ndarray]:
+    """Load a cached array.
+
+    :param key: the key of the array, see cache_key.
+    :param cache_directory: the directory of the cache. Default to
+    default_cache_directory().
+    :return: the cached array or None if the key is not in the cache.
+    """
+    try:
+        return np.load(_entry_path(key, "npy", cache_directory))
+    except FileNotFoundError:
+        return None
+
+
+def save_array(key: str, array: np.ndarray, cache_directory: str = None):
+    """Save an array in the cache.
+
+    :param key: the key of the array, see cache_key.
+    :param array: the array to save.
+    :param cache_directory: the directory of the cache. Default to
+    default_cache_directory().
+    """
+    _atomic_write(_entry_path(key, "npy", cache_directory),
+                  lambda f: np.save(f, array))
+
+
+def load_json(key: str, cache_directory: str = None):
+    """Load a cached JSON document.
+
+    :param key: the key of the document, see cache_key.
+    :param cache_directory: the directory of the cache. Default to
+    default_cache_directory().
+    :return: the cached document or None if the key is not in the cache.
+    """
+    try:
+        with open(_entry_path(key, "json", cache_directory)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_json(key: str, document, cache_directory: str = None):
+    """Save a JSON document in the cache.
+
+    :param key: the key of the document, see cache_key.
+    :param document: the document to save.
+    :param cache_directory: the directory of the cache. Default to
+    default_cache_directory().
+    """
+    _atomic_write(_entry_path(key, "json", cache_directory),
+                  lambda f: f.write(json.dumps(document, indent=4).encode()))
+
+
+@contextlib.contextmanager
+def locked(key: str, cache_directory: str = None):
+    """Hold an exclusive lock on a cache entry.
+
+    The lock is shared between processes: a process computing an entry
+    while holding the lock blocks the other processes that want to compute
+    the same entry, which can then read it from the cache.
+
+    :param key: the key of the entry, see cache_key.
+    :param cache_directory: the directory of the cache. Default to
+    default_cache_directory().
+    """
+    path = _entry_path(key, "lock", cache_directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
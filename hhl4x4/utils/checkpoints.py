@@ -0,0 +1,171 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+"""Simulate circuits stage by stage, caching the statevector after each stage.
+
+The circuits built by this package mark their stages with comments (for
+example "[4x4] 1. Quantum phase estimation."). The instructions between two
+marks form a stage, and the statevector after each stage is stored in the
+on-disk cache, keyed by a hash of all the instructions up to the end of the
+stage. Simulating a circuit that shares a prefix of stages with a circuit
+already simulated (for example a circuit with an other parameter r, which
+only changes the rotations) resumes from the deepest cached statevector
+instead of starting from |0...0>.
+
+The stages that are not cached are simulated in a single execution: a
+simulator snapshot instruction after each stage records the statevectors of
+the stage boundaries, so no stage is simulated twice. The initialize
+instruction of Qiskit is only used to resume from a cached statevector,
+never between two stages computed in the same run. As it prepares the
+cached statevector up to a global phase, the phase is measured with a
+snapshot taken right after the initialisation and removed from the
+statevectors of the following stages: the returned statevector has the
+same global phase as a direct simulation of the circuit.
+"""
+
+import typing
+
+import numpy as np
+import qiskit
+# Adds the snapshot instruction to QuantumCircuit.
+import qiskit.extensions.simulator  # noqa: F401
+from qiskit import CompositeGate
+
+from hhl4x4.custom_gates.comment import Comment
+from hhl4x4.utils.cache import cache_key, load_array, save_array
+from hhl4x4.utils.circuits import execute
+
+# Comments starting the stages of the HHL circuits.
+HHL_STAGES = ("[4x4] 1.", "[4x4] 2.", "[4x4] 3.")
+
+
+def _instructions(instructions) -> typing.Iterator:
+    """Iterate over the instructions, composite gates being flattened."""
+    for instruction in instructions:
+        if isinstance(instruction, CompositeGate):
+            yield from _instructions(instruction.data)
+        else:
+            yield instruction
+
+
+def split_stages(circuit: qiskit.QuantumCircuit,
+                 stages: typing.Sequence[str] = HHL_STAGES) -> typing.List[
+    typing.List]:
+    """Split the instructions of the circuit in stages.
+
+    :param circuit: the circuit to split. It is not modified.
+    :param stages: the beginning of the comments starting a new stage.
+    :return: the instructions of each stage, without the comments. The first
+    stage contains the instructions before the first marked comment.
+    """
+    split = [[]]
+    for instruction in _instructions(circuit.data):
+        if isinstance(instruction, Comment):
+            if instruction._text.startswith(tuple(stages)):
+                split.append([])
+            continue
+        split[-1].append(instruction)
+    return split
+
+
+def _qubits(circuit: qiskit.QuantumCircuit):
+    """The qubits of the circuit, in the order of Qiskit's statevectors."""
+    return [(register, i) for register in circuit.regs.values()
+            if isinstance(register, qiskit.QuantumRegister)
+            for i in range(register.size)]
+
+
+def simulate(circuit: qiskit.QuantumCircuit,
+             stages: typing.Sequence[str] = HHL_STAGES,
+             backend=None, cache_directory: str = None) -> np.ndarray:
+    """Simulate the circuit, resuming from the deepest cached stage.
+
+    :param circuit: the circuit to simulate, without measurement. It is not
+    modified.
+    :param stages: the beginning of the comments starting a new stage.
+    :param backend: the statevector simulator. Default to the Aer
+    statevector_simulator.
+    :param cache_directory: the directory of the cache. Default to
+    hhl4x4.utils.cache.default_cache_directory().
+    :return: the final statevector, in Qiskit's order.
+    """
+    if backend is None:
+        backend = qiskit.Aer.get_backend('statevector_simulator')
+    registers = list(circuit.regs.values())
+    split = split_stages(circuit, stages)
+
+    # The key of a stage depends on the keys of the previous stages.
+    keys = []
+    key = cache_key("statevector_checkpoint",
+                    [(register.name, register.size) for register in registers])
+    for instructions in split:
+        key = cache_key(key, "\n".join(instruction.qasm()
+                                       for instruction in instructions))
+        keys.append(key)
+
+    statevector, first_stage = None, 0
+    for index in reversed(range(len(keys))):
+        statevector = load_array(keys[index], cache_directory)
+        if statevector is not None:
+            first_stage = index + 1
+            break
+
+    if first_stage == len(split):
+        return statevector
+
+    # The snapshot slot k stores the statevector before the stage k (the
+    # slots must be numbers).
+    stage_circuit = qiskit.QuantumCircuit(*registers, name=circuit.name)
+    if statevector is not None:
+        stage_circuit.initialize(statevector.tolist(),
+                                 _qubits(stage_circuit))
+        stage_circuit.snapshot(str(first_stage))
+    for index in range(first_stage, len(split)):
+        for instruction in split[index]:
+            instruction.reapply(stage_circuit)
+        stage_circuit.snapshot(str(index + 1))
+    result = execute([stage_circuit], backend).result()
+    snapshots = result.get_snapshots(stage_circuit)
+
+    # The initialize instruction may change the global phase of the cached
+    # statevector: compute the phase to put back on the following stages.
+    phase = 1
+    if statevector is not None:
+        initialized = np.asarray(
+            snapshots[str(first_stage)]["statevector"][0])
+        overlap = np.vdot(initialized, statevector)
+        phase = overlap / abs(overlap)
+
+    for index in range(first_stage, len(split)):
+        statevector = phase * np.asarray(
+            snapshots[str(index + 1)]["statevector"][0])
+        save_array(keys[index], statevector, cache_directory)
+    return statevector
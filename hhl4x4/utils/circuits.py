@@ -0,0 +1,79 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+"""This module contains helpers to manipulate whole quantum circuits."""
+
+import typing
+
+import qiskit
+
+from hhl4x4.custom_gates.comment import strip_comments
+
+
+def snapshot(circuit: qiskit.QuantumCircuit,
+             *registers: qiskit.ClassicalRegister) -> qiskit.QuantumCircuit:
+    """Return a copy-on-write snapshot of the given circuit.
+
+    The snapshot has the same registers as the circuit and shares its
+    instructions instead of deep-copying them: only the list of instructions
+    is copied, so adding instructions to the circuit or to the snapshot does
+    not change the other one. The shared instructions should not be modified
+    in place (with their inverse, c_if or q_if methods for example), use an
+    InverseGate to invert a shared gate.
+
+    :param circuit: the circuit to copy. It is not modified.
+    :param registers: additional registers added to the snapshot, for
+    example the classical registers storing measurements.
+    :return: the snapshot of the circuit.
+    """
+    circuit_snapshot = qiskit.QuantumCircuit(*circuit.regs.values(),
+                                             *registers)
+    circuit_snapshot.data = list(circuit.data)
+    return circuit_snapshot
+
+
+def execute(circuits: typing.List[qiskit.QuantumCircuit], backend,
+            **kwargs):
+    """Execute the given circuits without their comments.
+
+    Every execution of a circuit of this package should go through this
+    function: Qiskit can not compile the comments (see
+    hhl4x4.custom_gates.comment).
+
+    :param circuits: the circuits to execute. They are not modified.
+    :param backend: the backend executing the circuits.
+    :param kwargs: forwarded to qiskit.execute.
+    :return: the job returned by qiskit.execute. The stripped circuits have
+    the names of the given circuits, so the results can be read with the
+    given circuits.
+    """
+    return qiskit.execute([strip_comments(circuit) for circuit in circuits],
+                          backend, **kwargs)
@@ -128,10 +128,20 @@ def apply_BE_operation(container: GateContainer,
 
 
 def swap_endianness(self: GateContainer,
-                    qreg: typing.Union[QRegisterBE, QRegisterLE]):
-    """Swaps the endianness of qreg."""
+                    qreg: typing.Union[QRegisterBE, QRegisterLE],
+                    virtual: bool = False):
+    """Swaps the endianness of qreg.
+
+    :param self: the circuit or gate on which the SWAP gates are applied.
+    :param qreg: the register to swap.
+    :param virtual: if True, no gate is added and the qubits of qreg are
+    relabelled instead: qreg[i] then refers to the qubit that was
+    qreg[len(qreg) - 1 - i]. The physical order of the qubits, used by the
+    simulators and the measurements, is not changed.
+    """
+    if virtual:
+        qreg._reverse_access_endian()
+        return
     qubit_number = len(qreg)
     for i in range(qubit_number//2):
         self.swap(qreg[i], qreg[qubit_number-1-i])
-
-
@@ -0,0 +1,288 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""This module contains a peephole optimisation pass for quantum circuits.
+
+The composite gates of the custom_gates package are flattened and the
+resulting sequence of gates is simplified with local rules:
+
+1) CRZZGate, which only adds a phase when its control qubit is in the |1>
+   state, is replaced by a u1 gate on its control qubit.
+2) Adjacent gates that are the inverse of each other (for example the h
+   gates of 2 consecutive CCZGate or a t gate followed by a tdg gate) are
+   removed.
+3) Adjacent u1 (respectively cu1) gates acting on the same qubits are
+   fused in one gate, which is removed if its angle is a multiple of 2 pi.
+
+Two gates are adjacent if no other gate acts on their qubits between them.
+Comments do not act on any qubit and never prevent a simplification.
+Instructions that are not gates (measurements, barriers, ...) and gates
+conditioned on a classical register are never simplified.
+"""
+
+import collections
+import math
+import typing
+
+import qiskit
+from qiskit import CompositeGate
+
+from hhl4x4.custom_gates.comment import Comment
+from hhl4x4.custom_gates.crzz import CRZZGate
+from hhl4x4.custom_gates.inverse import InverseGate
+
+# Gates that are their own inverse.
+SELF_INVERSE_GATES = {"id", "x", "y", "z", "h", "cx", "cy", "cz", "ch", "ccx",
+                      "swap"}
+# Pairs of gates that are the inverse of each other.
+INVERSE_GATES = {("s", "sdg"), ("sdg", "s"), ("t", "tdg"), ("tdg", "t")}
+# Gates whose angles can be summed.
+FUSIBLE_GATES = {"u1", "cu1"}
+# Gates whose result does not depend on the order of their qubits.
+SYMMETRIC_GATES = {"cz", "swap", "cu1"}
+
+
+class _Operation:
+    """A gate, or an other instruction, of the flattened circuit."""
+
+    def __init__(self, name: str, param: typing.List, arg: typing.List,
+                 instruction=None):
+        """Initialise the _Operation class.
+
+        :param name: the name of the gate.
+        :param param: the parameters of the gate.
+        :param arg: the qubits (and bits) used by the gate.
+        :param instruction: the Qiskit instruction, if it has not been
+        modified by the optimisation pass.
+        """
+        self.name = name
+        self.param = param
+        self.arg = arg
+        self.instruction = instruction
+
+    @property
+    def is_comment(self) -> bool:
+        return isinstance(self.instruction, Comment)
+
+    @property
+    def is_simplifiable(self) -> bool:
+        return self.instruction is None or (
+                getattr(self.instruction, 'control', None) is None and
+                self.name in SELF_INVERSE_GATES | FUSIBLE_GATES | {
+            name for name, _ in INVERSE_GATES})
+
+    @property
+    def keys(self) -> typing.List[typing.Tuple[str, int]]:
+        """Hashable identifiers of the qubits (and bits) used by the gate."""
+        return [(register.name, index) for register, index in self.arg]
+
+    @property
+    def signature(self):
+        """Identifier of the qubits, taking into account the symmetries."""
+        if self.name in SYMMETRIC_GATES:
+            return frozenset(self.keys)
+        if self.name == "ccx":
+            return frozenset(self.keys[:2]), self.keys[2]
+        return tuple(self.keys)
+
+    def apply(self, circuit: qiskit.QuantumCircuit):
+        """Add the gate at the end of the given circuit."""
+        if self.instruction is not None:
+            self.instruction.reapply(circuit)
+        else:
+            getattr(circuit, self.name)(*self.param, *self.arg)
+
+
+def _crzz_angle(instruction):
+    """Return the phase added by the instruction if it is a (possibly
+    inverted) CRZZGate without classical control, None otherwise."""
+    inverted = False
+    while isinstance(instruction, InverseGate) and instruction.control is None:
+        inverted ^= not instruction.inverse_flag
+        instruction = instruction.gate
+    if not isinstance(instruction, CRZZGate) or instruction.control is not None:
+        return None
+    inverted ^= instruction.inverse_flag
+    return -instruction.param[0] if inverted else instruction.param[0]
+
+
+def _flatten(instructions, simplify_composites: bool = True):
+    """Iterate over the gates of the given instructions, composite gates
+    being replaced by the gates they contain."""
+    for instruction in instructions:
+        theta = _crzz_angle(instruction) if simplify_composites else None
+        if theta is not None:
+            yield _Operation("u1", [theta], [instruction.arg[0]])
+        elif isinstance(instruction, CompositeGate):
+            yield from _flatten(instruction.data, simplify_composites)
+        else:
+            yield _Operation(instruction.name, list(instruction.param),
+                             list(instruction.arg), instruction)
+
+
+def _is_multiple_of_2pi(angle) -> bool:
+    try:
+        turns = float(angle) / (2 * math.pi)
+    except TypeError:
+        # Symbolic angle that can not be evaluated.
+        return False
+    return abs(turns - round(turns)) < 1e-12
+
+
+# Returned by _fuse when the 2 gates cancel each other.
+_CANCELLED = object()
+
+
+def _fuse(first: _Operation, second: _Operation):
+    """Simplify 2 adjacent gates acting on the same qubits.
+
+    :return: _CANCELLED if the 2 gates cancel each other, the gate
+    equivalent to the 2 gates if they can be fused, None otherwise.
+    """
+    if first.signature != second.signature:
+        return None
+    if first.name == second.name and first.name in SELF_INVERSE_GATES:
+        return _CANCELLED
+    if (first.name, second.name) in INVERSE_GATES:
+        return _CANCELLED
+    if first.name == second.name and first.name in FUSIBLE_GATES:
+        angle = first.param[0] + second.param[0]
+        if _is_multiple_of_2pi(angle):
+            return _CANCELLED
+        return _Operation(first.name, [angle], first.arg)
+    return None
+
+
+def _simplify(operations: typing.Iterable[_Operation],
+              keep_comments: bool = True) -> typing.List[_Operation]:
+    kept = []
+    # For each qubit, the indices in kept of the gates acting on it.
+    stacks = collections.defaultdict(list)
+    for operation in operations:
+        if operation.is_comment:
+            if keep_comments:
+                kept.append(operation)
+            continue
+        keys = operation.keys
+        if operation.is_simplifiable:
+            last_indices = {stacks[key][-1] if stacks[key] else None
+                            for key in keys}
+            if len(last_indices) == 1 and None not in last_indices:
+                index = last_indices.pop()
+                previous = kept[index]
+                fused = None
+                if previous.is_simplifiable and \
+                        set(previous.keys) == set(keys):
+                    fused = _fuse(previous, operation)
+                if fused is _CANCELLED:
+                    kept[index] = None
+                    for key in keys:
+                        stacks[key].pop()
+                    continue
+                elif fused is not None:
+                    kept[index] = fused
+                    continue
+        for key in keys:
+            stacks[key].append(len(kept))
+        kept.append(operation)
+    return [operation for operation in kept if operation is not None]
+
+
+def gate_counts(circuit: qiskit.QuantumCircuit) -> typing.Counter[str]:
+    """Count the gates of the given circuit, composite gates being
+    flattened. Comments are not counted."""
+    return collections.Counter(
+        operation.name for operation in
+        _flatten(circuit.data, simplify_composites=False)
+        if not operation.is_comment)
+
+
+def depth(circuit: qiskit.QuantumCircuit) -> int:
+    """Compute the depth of the given circuit, composite gates being
+    flattened. Comments and barriers are not counted."""
+    # For each qubit (and bit), the number of layers up to its last gate.
+    layers = collections.Counter()
+    for operation in _flatten(circuit.data, simplify_composites=False):
+        if operation.is_comment or operation.name == "barrier":
+            continue
+        keys = operation.keys
+        layer = max(layers[key] for key in keys) + 1
+        for key in keys:
+            layers[key] = layer
+    return max(layers.values(), default=0)
+
+
+class OptimisationReport:
+    """Gate counts before and after the optimisation pass."""
+
+    def __init__(self, counts_before: typing.Counter[str],
+                 counts_after: typing.Counter[str]):
+        self.counts_before = counts_before
+        self.counts_after = counts_after
+
+    @property
+    def gates_before(self) -> int:
+        return sum(self.counts_before.values())
+
+    @property
+    def gates_after(self) -> int:
+        return sum(self.counts_after.values())
+
+    def __str__(self):
+        lines = ["Gate count: {} -> {} ({:+.1f}%)".format(
+            self.gates_before, self.gates_after,
+            100 * (self.gates_after - self.gates_before) / max(
+                1, self.gates_before))]
+        for name in sorted(set(self.counts_before) | set(self.counts_after)):
+            lines.append("    {:<8} {:>6} -> {:>6}".format(
+                name, self.counts_before[name], self.counts_after[name]))
+        return "\n".join(lines)
+
+
+def optimise(circuit: qiskit.QuantumCircuit,
+             keep_comments: bool = True) -> typing.Tuple[
+    qiskit.QuantumCircuit, OptimisationReport]:
+    """Apply the peephole optimisation pass on the given circuit.
+
+    :param circuit: the circuit to optimise. It is not modified.
+    :param keep_comments: if False, the comments are removed from the
+    optimised circuit, which is useful if it is only simulated.
+    :return: a new circuit, with the same registers and without composite
+    gates, and the report of the gate counts.
+    """
+    operations = _simplify(_flatten(circuit.data), keep_comments)
+    optimised_circuit = qiskit.QuantumCircuit(*circuit.regs.values())
+    for operation in operations:
+        operation.apply(optimised_circuit)
+    report = OptimisationReport(gate_counts(circuit),
+                                gate_counts(optimised_circuit))
+    return optimised_circuit, report
@@ -29,16 +29,64 @@
 # knowledge of the CeCILL-B license and that you accept its terms.
 # ======================================================================
 
-"""This module contains all the functions and classes related to registers."""
+"""This module contains all the functions and classes related to registers.
 
+The registers defined here are views: they do not own any qubit but refer to
+a shared, immutable sequence of qubits (the "storage") with a range of
+indices. Slicing a register only slices the range of indices and bonding
+registers only stores references to their storages, so neither of these
+operations copies the qubits of the parent registers.
+"""
+
+import bisect
+import itertools
 import typing
-from copy import deepcopy
+
 import qiskit
 
+QubitType = typing.Tuple[qiskit.QuantumRegister, int]
+
+
+class _ConcatenatedQubits:
+    """Read-only sequence of qubits made of several (storage, indices)
+    segments glued together.
+
+    The first index of each segment is precomputed so that a qubit is found
+    with a binary search over the segments.
+    """
 
-def _get_slice_size(slice_instance: slice, container_size: int):
-    start, stop, step = slice_instance.indices(container_size)
-    return (stop - start) // step + (1 if (stop - start) % step != 0 else 0)
+    def __init__(self, segments: typing.List[typing.Tuple[typing.Sequence,
+                                                          range]]):
+        self._segments = []
+        for storage, indices in segments:
+            # Bonding bonded registers should not increase the depth of the
+            # lookups, so fully used concatenations are flattened.
+            if isinstance(storage, _ConcatenatedQubits) and \
+                    len(indices) == len(storage):
+                if indices == range(len(storage)):
+                    self._segments.extend(storage._segments)
+                    continue
+                if indices == range(len(storage))[::-1]:
+                    self._segments.extend(
+                        (sub_storage, sub_indices[::-1]) for
+                        sub_storage, sub_indices in reversed(storage._segments))
+                    continue
+            self._segments.append((storage, indices))
+        self._offsets = list(
+            itertools.accumulate(len(indices) for _, indices in self._segments))
+        self._size = self._offsets[-1] if self._offsets else 0
+        # _offsets[i] is the index of the first qubit of the i-th segment.
+        self._offsets = [0] + self._offsets[:-1]
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key: int) -> QubitType:
+        if key < 0 or key >= self._size:
+            raise IndexError("Index {} out of range.".format(key))
+        segment = bisect.bisect_right(self._offsets, key) - 1
+        storage, indices = self._segments[segment]
+        return storage[indices[key - self._offsets[segment]]]
 
 
 class QRegisterBase(qiskit.QuantumRegister):
@@ -48,17 +96,26 @@ class QRegisterBase(qiskit.QuantumRegister):
         if len(args) == 1 and isinstance(args[0], qiskit.QuantumRegister):
             quantum_register = args[0]
             super().__init__(quantum_register.size, quantum_register.name)
-            if isinstance(args[0], QRegisterBase):
+            if isinstance(quantum_register, QRegisterBase):
+                # Share the qubits of the copied register.
+                self._storage = quantum_register._storage
+                self._indices = quantum_register._indices
                 self._reversed = quantum_register._reversed
+                self._qubit_tables = quantum_register._qubit_tables
             else:
+                self._storage = tuple(quantum_register[i]
+                                      for i in range(quantum_register.size))
+                self._indices = range(quantum_register.size)
                 self._reversed = False
-            self._register = args[0]
+                self._qubit_tables = None
 
         elif len(args) >= 2 and isinstance(args[0], int) and isinstance(args[1],
                                                                         str):
             super().__init__(args[0], args[1])
+            self._storage = tuple((self, i) for i in range(self.size))
+            self._indices = range(self.size)
             self._reversed = False
-            self._register = self
+            self._qubit_tables = None
 
         else:
             raise NotImplementedError("({})".format(','.join(map(type, args))))
@@ -71,20 +128,44 @@ class QRegisterBase(qiskit.QuantumRegister):
         # Update the flag
         self._reversed = not self._reversed
 
+    def _visible_indices(self) -> range:
+        """The indices in self._storage of the qubits, in access order."""
+        return self._indices[::-1] if self._reversed else self._indices
+
+    def _get_qubit_tables(self) -> typing.Tuple[typing.Tuple[QubitType, ...],
+                                                typing.Tuple[QubitType, ...]]:
+        """The qubits of the register in the initial and in the reversed access
+        order.
+
+        The 2 tables are computed on the first access and then cached, so
+        reversing the endianness only changes the table used by __getitem__.
+        """
+        if self._qubit_tables is None:
+            qubits = tuple(self._storage[index] for index in self._indices)
+            self._qubit_tables = (qubits, qubits[::-1])
+        return self._qubit_tables
+
     def __getitem__(self, key):
+        """Return the qubit at the given index, or a view on the qubits
+        selected by the given slice.
+
+        Indices and slices both follow the current access order: if the
+        endianness of the register is reversed, qreg[0:2] contains qreg[0] and
+        qreg[1], not the first 2 qubits of the underlying register.
+        """
         if isinstance(key, slice):
-            return SplittableQuantumRegister(self._register, key)
-        else:
-            if self._reversed:
-                return self._register.__getitem__(len(self._register) - 1 - key)
-            else:
-                return self._register.__getitem__(key)
+            return SplittableQuantumRegister(self, key)
+        if 0 <= key < self.size:
+            return self._get_qubit_tables()[self._reversed][key]
+        raise IndexError(
+            ("Trying to obtain the bit n°{} from a register of size {"
+             "}").format(key, self.size))
 
     def __add__(self, other):
-        return BondableQuantumRegister(self._register, other)
+        return BondableQuantumRegister(self, other)
 
     def __iadd__(self, other):
-        return BondableQuantumRegister(self._register, other)
+        return self + other
 
 
 class SplittableQuantumRegister(QRegisterBase):
@@ -98,44 +179,26 @@ class SplittableQuantumRegister(QRegisterBase):
                splittable_reg = SplittableQuantumRegister("qreg", 10)
                qubit_3 = splittable_reg[3]
                qubit_6 = splittable_reg[::3][2]
+    The returned register is a view on the qubits of qreg: the qubits are not
+    copied and changing the endianness of qreg afterwards does not change the
+    view. The slice is applied in the access order of qreg at the time of
+    the slicing, so if the endianness of qreg is reversed the view contains
+    the qubits qreg[i] selected by the slice, in the same order.
     """
 
-    def __init__(self, qreg: QRegisterBase, *args):
+    def __init__(self, qreg: qiskit.QuantumRegister, *args):
+        if not isinstance(qreg, QRegisterBase):
+            qreg = QRegisterBase(qreg)
+        super().__init__(qreg)
         if len(args) >= 1 and isinstance(args[0], slice):
             self._slice = args[0]
-            # Update the size if the slice is given by the user
-            size = _get_slice_size(self._slice, len(qreg))
         else:
             self._slice = slice(len(qreg))
-            size = len(qreg)
-        super().__init__(qreg)
-        self.size = size
-        # Deepcopy is terrible if we chain a huge amount of slicings
-        # but it avoids side effects.
-        self._register = deepcopy(qreg)
-
-    def __getitem__(self, key: typing.Union[int, slice]):
-        # If the user gave a slice, then return an other splittable register.
-        if isinstance(key, slice):
-            return SplittableQuantumRegister(self, key)
-        # Else, recursively call __getitem__ on the self._register list.
-        else:
-            start, stop, step = self._slice.indices(self.size)
-            if key < 0 or key >= stop:
-                raise IndexError(
-                    ("Trying to obtain the bit n°{} from a register of size {"
-                     "}").format(key, self.size))
-            if self._reversed:
-                return self._register.__getitem__(
-                    start + (self.size - 1 - key) * step)
-            else:
-                return self._register.__getitem__(start + key * step)
-
-    def __add__(self, other: QRegisterBase):
-        return BondableQuantumRegister(self, other)
-
-    def __iadd__(self, other: QRegisterBase):
-        return self + other
+        # Slicing a range is O(1) and the qubits are still accessed in O(1).
+        self._indices = qreg._visible_indices()[self._slice]
+        self._reversed = False
+        self._qubit_tables = None
+        self.size = len(self._indices)
 
 
 class BondableQuantumRegister(QRegisterBase):
@@ -144,47 +207,69 @@ class BondableQuantumRegister(QRegisterBase):
     composed of
     one or more QuantumRegister that are glued together.
     The class BondableQuantumRegister implements the operations:
+        1) Creation from several instances of QuantumRegister.
+        2) Use of classical indices and of slices, the qubits of the first
+           register being the first qubits of the bonded register.
+    The bonded registers are not copied: changing their endianness afterwards
+    does not change the bonded register. A qubit is found in O(log k), k
+    being the number of bonded registers.
     """
 
-    def __init__(self, qreg: QRegisterBase, *args):
+    def __init__(self, qreg: qiskit.QuantumRegister, *args):
         # Construct from a list of QuantumRegisters
-        # Deepcopy is terrible if we chain a huge amount of bonding
-        # but it avoids side effects.
-        self._registers = [deepcopy(qreg)]
-        self._registers += [deepcopy(arg) for arg in args if
-                            isinstance(arg, QRegisterBase)]
+        self._registers = [qreg]
+        self._registers += [arg for arg in args if
+                            isinstance(arg, qiskit.QuantumRegister)]
+        self._registers = [register if isinstance(register, QRegisterBase)
+                           else QRegisterBase(register)
+                           for register in self._registers]
         # Concatenating the names and summing the sizes.
-        super().__init__("".join(map(lambda x: x.name, self._registers)),
-                         sum(map(lambda x: x.size, self._registers)))
+        qiskit.QuantumRegister.__init__(
+            self, sum(map(lambda x: x.size, self._registers)),
+            "".join(map(lambda x: x.name, self._registers)))
+        self._storage = _ConcatenatedQubits(
+            [(register._storage, register._visible_indices())
+             for register in self._registers])
+        self._indices = range(self.size)
+        self._reversed = False
+        self._qubit_tables = None
 
-    def __getitem__(self, key: int):
-        if isinstance(key, slice):
-            return SplittableQuantumRegister(self, key)
 
-        total_index = 0
-        registers = self._registers if not self._reversed else self._registers[
-                                                               ::-1]
-        for register in registers:
-            if (key - total_index) < len(register):
-                if self._reversed:
-                    return register[len(register) - 1 - (key - total_index)]
-                else:
-                    return register[key - total_index]
-            total_index += len(register)
-        # If we are here, this means that the given key was not a valid index
-        # for the register, so we raise an exception
-        raise IndexError(
-            "Trying to obtain the bit n°{} from a register of size {}".format(
-                key, self.size))
+class PermutedQuantumRegister(QRegisterBase):
+    """Implement a register whose qubits can be permuted without any gate.
+    A permuted register is a view on the qubits of a QuantumRegister that
+    tracks the swaps applied to it: swapping 2 qubits with swap_qubits does
+    not add any SWAP gate to the circuit but changes the qubits accessed by
+    the indices, exactly like if the qubits were swapped, the gates applied
+    on the swapped qubits and the qubits swapped back.
+        permuted_reg = PermutedQuantumRegister(qreg)
+        permuted_reg.swap_qubits(1, 2)
+        assert permuted_reg[1] == qreg[2]
+    The qubits of qreg are not copied and qreg is not modified.
+    """
 
-    def __add__(self, other: QRegisterBase):
-        return BondableQuantumRegister(self, other)
+    def __init__(self, qreg: qiskit.QuantumRegister):
+        if not isinstance(qreg, QRegisterBase):
+            qreg = QRegisterBase(qreg)
+        super().__init__(qreg)
 
-    def __iadd__(self, other: QRegisterBase):
-        return self + other
+    def swap_qubits(self, first: int, second: int):
+        """Swap the qubits accessed with the indices first and second.
+
+        :param first: index of the first qubit in the current access order.
+        :param second: index of the second qubit in the current access order.
+        """
+        qubits = list(self._get_qubit_tables()[self._reversed])
+        qubits[first], qubits[second] = qubits[second], qubits[first]
+        # The storage is now in the current access order.
+        self._storage = tuple(qubits)
+        self._indices = range(self.size)
+        self._reversed = False
+        self._qubit_tables = None
 
 
 class CRegisterBase(qiskit.ClassicalRegister):
+
     """Classical Register."""
     def __init__(self, *args, **kwargs):
         # Copy constructor
@@ -0,0 +1,143 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""This module contains functions to manipulate the statevectors returned by
+the Qiskit simulators.
+
+Qiskit stores the amplitudes of a quantum state with the first qubit of the
+first register as the least significant bit of the index. The functions of
+this module work on reshaped views of the statevector (one axis per qubit)
+instead of looping over the amplitudes, so their cost is dominated by NumPy
+memory operations, even for large registers.
+"""
+
+import typing
+
+import numpy as np
+
+
+def _register_axes(register_sizes: typing.Sequence[int],
+                   big_endian: typing.Sequence[bool] = None) -> typing.List[
+    int]:
+    """Compute the permutation of the qubit axes used to reorder registers.
+
+    :param register_sizes: the sizes of the registers, in the order they were
+    added to the quantum circuit.
+    :param big_endian: for each register, True if its first qubit should be
+    the most significant bit of the register value. Default to False for all
+    the registers.
+    :return: the axes to give to numpy.transpose on a statevector reshaped as
+    (2,) * number_of_qubits.
+    """
+    if big_endian is None:
+        big_endian = [False] * len(register_sizes)
+    if len(big_endian) != len(register_sizes):
+        raise ValueError("Expected one endianness flag per register, got {} "
+                         "flags for {} registers.".format(len(big_endian),
+                                                         len(register_sizes)))
+
+    qubits_number = sum(register_sizes)
+    axes = []
+    offset = 0
+    for size, is_big_endian in zip(register_sizes, big_endian):
+        # Qubit q of the circuit is stored on the axis qubits_number - 1 - q
+        # of the reshaped statevector (the first axis is the most significant
+        # bit of the index).
+        qubits = range(offset, offset + size)
+        if not is_big_endian:
+            qubits = reversed(qubits)
+        axes.extend(qubits_number - 1 - qubit for qubit in qubits)
+        offset += size
+    return axes
+
+
+def reorder_registers(statevector: np.ndarray,
+                      register_sizes: typing.Sequence[int],
+                      big_endian: typing.Sequence[bool] = None) -> np.ndarray:
+    """Reorder the registers of a statevector returned by Qiskit.
+
+    In the returned statevector, the first register is the most significant
+    part of the index and the last register is the least significant one,
+    which is the order we use to read the registers of a circuit.
+
+    :param statevector: the statevector returned by a Qiskit simulator.
+    :param register_sizes: the sizes of the quantum registers, in the order
+    they were added to the quantum circuit.
+    :param big_endian: for each register, True if its first qubit should be
+    the most significant bit of the register value. Default to False for all
+    the registers, i.e. only the registers order is changed.
+    :return: the reordered statevector.
+    """
+    qubits_number = sum(register_sizes)
+    if statevector.shape != (2 ** qubits_number,):
+        raise ValueError("The statevector has {} amplitudes but the registers "
+                         "contain {} qubits.".format(statevector.size,
+                                                     qubits_number))
+    axes = _register_axes(register_sizes, big_endian)
+    tensor = statevector.reshape((2,) * qubits_number)
+    return np.transpose(tensor, axes).reshape(-1)
+
+
+def postselect(statevector: np.ndarray, qubit_index: int,
+               value: bool = True) -> typing.Tuple[np.ndarray, float]:
+    """Postselect the statevector returned by Qiskit on the value of a qubit.
+
+    The statevector is reshaped so that the postselected qubit is an axis of
+    the tensor: the amplitudes of the selected branch are read through a
+    strided view and the only full-size array is the given statevector.
+
+    :param statevector: the statevector returned by a Qiskit simulator.
+    :param qubit_index: the index of the postselected qubit in the circuit,
+    in Qiskit's order (the first qubit of the first register has index 0).
+    :param value: the postselected value of the qubit.
+    :return: the normalised statevector of the remaining qubits, in Qiskit's
+    order, and the probability to measure the qubit in the given state.
+    """
+    qubits_number = statevector.size.bit_length() - 1
+    if statevector.shape != (2 ** qubits_number,):
+        raise ValueError("The statevector has {} amplitudes, which is not a "
+                         "power of 2.".format(statevector.size))
+    if not 0 <= qubit_index < qubits_number:
+        raise IndexError("Trying to postselect the qubit n°{} of a {} qubits "
+                         "statevector.".format(qubit_index, qubits_number))
+
+    # The qubit qubit_index is the middle axis: the amplitudes with the qubit
+    # in the state |value> are a strided view of the statevector.
+    branch = statevector.reshape(-1, 2, 2 ** qubit_index)[:, int(value), :]
+    probability = float(np.sum(branch.real ** 2) + np.sum(branch.imag ** 2))
+    if probability == 0:
+        raise ValueError("The qubit n°{} is never measured in the state "
+                         "|{}>.".format(qubit_index, int(value)))
+
+    selected = np.empty(branch.shape, dtype=statevector.dtype)
+    np.divide(branch, np.sqrt(probability), out=selected)
+    return selected.reshape(-1), probability
@@ -0,0 +1,172 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""This module contains the unitary matrices of the custom gates.
+
+The matrices are the ones obtained by the Qiskit simulators, i.e. they
+take into account the decomposition of the gates in the Qiskit basis (for
+example the phase added by the cu3 gate, see custom_gates/crx.py). They are
+used to evaluate the unitary matrix of Hamiltonian4x4Gate without building
+and simulating a quantum circuit.
+
+All the custom gates used by Hamiltonian4x4Gate are controlled by the same
+qubit, so the matrices below are the matrices applied on the target qubits
+when the control qubit is in the |1> state. Matrices acting on 2 target
+qubits use the Qiskit ordering: the first target qubit is the least
+significant bit.
+"""
+
+import typing
+
+import numpy as np
+
+IDENTITY = np.eye(2, dtype=complex)
+PAULI_X = np.array([[0, 1], [1, 0]], dtype=complex)
+
+# Matrix applied by CsqrtX.
+CSQRTX_MATRIX = 0.5 * np.array([[1 + 1.j, 1 - 1.j],
+                                [1 - 1.j, 1 + 1.j]])
+
+# Matrix applied by CCZGate, the 2 target qubits being the second control
+# qubit and the target qubit.
+CCZ_MATRIX = np.diag([1, 1, 1, -1]).astype(complex)
+
+# Matrix applied by the ccx gate, the 2 target qubits being the second
+# control qubit and the target qubit.
+CCX_MATRIX = np.array([[1, 0, 0, 0],
+                       [0, 0, 0, 1],
+                       [0, 0, 1, 0],
+                       [0, 1, 0, 0]], dtype=complex)
+
+
+def crx_matrix(theta: float) -> np.ndarray:
+    """Matrix applied by CRxGate.
+
+    The cu3 gate used by CRxGate, with its phase corrected by CRZZGate,
+    applies Rx(-theta).
+    """
+    cos, sin = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[cos, 1.j * sin],
+                     [1.j * sin, cos]])
+
+
+def crzz_matrix(theta: float) -> np.ndarray:
+    """Matrix applied by CRZZGate: a global phase shift."""
+    return np.exp(1.j * theta) * IDENTITY
+
+
+def on_first_qubit(matrix: np.ndarray) -> np.ndarray:
+    """Extend a 1-qubit matrix to the 2 target qubits."""
+    return np.kron(IDENTITY, matrix)
+
+
+def on_second_qubit(matrix: np.ndarray) -> np.ndarray:
+    """Extend a 1-qubit matrix to the 2 target qubits."""
+    return np.kron(matrix, IDENTITY)
+
+
+def hamiltonian4x4_matrices(params: typing.Sequence[float]) -> typing.List[
+    np.ndarray]:
+    """Matrices applied on the 2 target qubits by Hamiltonian4x4Gate.
+
+    :param params: the 5 parameters of Hamiltonian4x4Gate.
+    :return: the 4x4 matrices of the gates, in the order they are applied.
+    """
+    return [CCZ_MATRIX,
+            on_second_qubit(crx_matrix(params[0])),
+            on_second_qubit(CSQRTX_MATRIX.conj().T),
+            on_second_qubit(crzz_matrix(params[1])),
+            on_first_qubit(crx_matrix(params[2])),
+            on_first_qubit(crzz_matrix(params[3])),
+            CCX_MATRIX,
+            on_first_qubit(crx_matrix(params[4])),
+            CCX_MATRIX,
+            CCZ_MATRIX]
+
+
+def hamiltonian4x4_derivatives(params: typing.Sequence[float]) -> \
+        typing.Tuple[np.ndarray, typing.List[np.ndarray]]:
+    """Matrix applied on the 2 target qubits by Hamiltonian4x4Gate and its
+    derivatives with respect to the parameters.
+
+    Each parameter appears in exactly one gate G(theta) = exp(theta * K),
+    so the derivative of the product of the gate matrices is obtained by
+    inserting K in front of G(theta).
+
+    :param params: the 5 parameters of Hamiltonian4x4Gate.
+    :return: the 4x4 matrix and the list of its 5 partial derivatives.
+    """
+    matrices = hamiltonian4x4_matrices(params)
+    # For each parameter: the position of its gate in matrices and K.
+    generators = [(1, on_second_qubit(0.5j * PAULI_X)),
+                  (3, 1.j * np.eye(4)),
+                  (4, on_first_qubit(0.5j * PAULI_X)),
+                  (5, 1.j * np.eye(4)),
+                  (7, on_first_qubit(0.5j * PAULI_X))]
+
+    # prefixes[i] is the product of the i first matrices and suffixes[i]
+    # the product of the remaining ones.
+    prefixes = [np.eye(4, dtype=complex)]
+    for gate_matrix in matrices:
+        prefixes.append(gate_matrix @ prefixes[-1])
+    suffixes = [np.eye(4, dtype=complex)]
+    for gate_matrix in reversed(matrices):
+        suffixes.append(suffixes[-1] @ gate_matrix)
+    suffixes.reverse()
+
+    derivatives = [suffixes[position + 1] @ generator @ prefixes[position + 1]
+                   for position, generator in generators]
+    return prefixes[-1], derivatives
+
+
+def controlled(matrix: np.ndarray) -> np.ndarray:
+    """Add a control qubit to the given matrix.
+
+    The control qubit is the first qubit, i.e. the least significant bit.
+    """
+    size = matrix.shape[0]
+    unitary = np.eye(2 * size, dtype=complex)
+    unitary[1::2, 1::2] = matrix
+    return unitary
+
+
+def hamiltonian4x4_unitary(params: typing.Sequence[float]) -> np.ndarray:
+    """Compute the unitary matrix of Hamiltonian4x4Gate.
+
+    :param params: the 5 parameters of Hamiltonian4x4Gate.
+    :return: the 8x8 unitary matrix of the gate, the control qubit being the
+    first qubit and the 2 target qubits the second and third ones.
+    """
+    matrix = np.eye(4, dtype=complex)
+    for gate_matrix in hamiltonian4x4_matrices(params):
+        matrix = gate_matrix @ matrix
+    return controlled(matrix)
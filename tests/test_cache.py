@@ -0,0 +1,98 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Tests of the on-disk cache."""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from hhl4x4.utils import cache
+from hhl4x4.utils.cache import cache_key, load_array, load_json, locked, \
+    save_array, save_json
+
+
+def test_cache_key():
+    assert cache_key("a", [1, 2], np.eye(2)) == \
+        cache_key("a", [1, 2], np.eye(2))
+    assert cache_key("a", [1, 2]) != cache_key("a", (1, 2, 3))
+    assert cache_key(np.eye(2)) != cache_key(np.eye(2, dtype=complex))
+
+
+def test_missing_entries(tmp_path):
+    key = cache_key("missing")
+    assert load_array(key, str(tmp_path)) is None
+    assert load_json(key, str(tmp_path)) is None
+
+
+def test_array_round_trip(tmp_path):
+    key = cache_key("array")
+    array = np.arange(6, dtype=complex).reshape(2, 3)
+    save_array(key, array, str(tmp_path))
+    assert np.array_equal(load_array(key, str(tmp_path)), array)
+
+
+def test_json_round_trip(tmp_path):
+    key = cache_key("json")
+    document = [{"parameters": [0.5, 1.0], "error": 1e-8}]
+    save_json(key, document, str(tmp_path))
+    assert load_json(key, str(tmp_path)) == document
+
+
+def test_default_cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("HHL4X4_CACHE_DIR", str(tmp_path))
+    assert cache.default_cache_directory() == str(tmp_path)
+
+
+@pytest.mark.skipif(cache.fcntl is None, reason="fcntl is not available.")
+def test_locked(tmp_path):
+    # The second holder of the lock waits for the first one.
+    key = cache_key("lock")
+    events = []
+    acquired = threading.Event()
+
+    def hold_lock():
+        with locked(key, str(tmp_path)):
+            acquired.set()
+            events.append("first acquired")
+            time.sleep(0.2)
+            events.append("first released")
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    acquired.wait()
+    with locked(key, str(tmp_path)):
+        events.append("second acquired")
+    thread.join()
+    assert events == ["first acquired", "first released", "second acquired"]
@@ -0,0 +1,121 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Tests of the simulation resumed from the cached stages."""
+
+import numpy as np
+import pytest
+
+qiskit = pytest.importorskip("qiskit")
+
+import hhl4x4.utils.checkpoints as checkpoints
+from hhl4x4.utils.circuits import execute
+
+
+def _staged_circuit(angle: float):
+    """A circuit with three marked stages, the last one depending on angle."""
+    qreg = qiskit.QuantumRegister(3, "q")
+    circuit = qiskit.QuantumCircuit(qreg)
+    # Preparation of a state with complex amplitudes, in the first stage.
+    circuit.u3(0.9, 0.3, 1.7, qreg[0])
+    circuit.u3(1.2, 2.1, 0.4, qreg[1])
+    circuit.u3(0.5, 1.3, 2.6, qreg[2])
+    circuit.t(qreg[0])
+    circuit.comment("[4x4] 1. First stage.")
+    circuit.cx(qreg[0], qreg[2])
+    circuit.u3(0.2, 0.4, 1.1, qreg[2])
+    circuit.comment("[4x4] 2. Second stage.")
+    circuit.cx(qreg[1], qreg[0])
+    circuit.s(qreg[2])
+    circuit.comment("[4x4] 3. Third stage.")
+    circuit.crz(angle, qreg[2], qreg[1])
+    circuit.rx(angle, qreg[0])
+    return circuit
+
+
+def _direct_simulation(circuit):
+    backend = qiskit.Aer.get_backend('statevector_simulator')
+    result = execute([circuit], backend).result()
+    return np.asarray(result.get_statevector(circuit))
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """Record the circuits executed by checkpoints.simulate."""
+    circuits = []
+
+    def recording_execute(to_execute, backend, **kwargs):
+        circuits.extend(to_execute)
+        return execute(to_execute, backend, **kwargs)
+
+    monkeypatch.setattr(checkpoints, "execute", recording_execute)
+    return circuits
+
+
+def _instruction_names(circuit):
+    return [instruction.name for instruction in circuit.data]
+
+
+def test_split_stages():
+    split = checkpoints.split_stages(_staged_circuit(0.5))
+    assert [len(stage) for stage in split] == [4, 2, 2, 2]
+
+
+def test_cold_cache(tmp_path, executed):
+    circuit = _staged_circuit(0.5)
+    statevector = checkpoints.simulate(circuit,
+                                       cache_directory=str(tmp_path))
+    assert np.allclose(statevector, _direct_simulation(circuit))
+    # A single execution, without any initialisation.
+    assert len(executed) == 1
+    assert "init" not in _instruction_names(executed[0])
+
+
+def test_resume_keeps_the_global_phase(tmp_path, executed):
+    checkpoints.simulate(_staged_circuit(0.5), cache_directory=str(tmp_path))
+    circuit = _staged_circuit(1.3)
+    statevector = checkpoints.simulate(circuit,
+                                       cache_directory=str(tmp_path))
+    # Resumed from the cached second stage...
+    assert len(executed) == 2
+    assert _instruction_names(executed[1])[0] == "init"
+    # ...with the global phase of a direct simulation.
+    assert np.allclose(statevector, _direct_simulation(circuit))
+
+
+def test_fully_cached(tmp_path, executed):
+    circuit = _staged_circuit(0.5)
+    expected = checkpoints.simulate(circuit, cache_directory=str(tmp_path))
+    statevector = checkpoints.simulate(circuit,
+                                       cache_directory=str(tmp_path))
+    assert len(executed) == 1
+    assert np.allclose(statevector, expected)
@@ -0,0 +1,79 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Tests of the comments and of their removal before the executions."""
+
+import numpy as np
+import pytest
+
+qiskit = pytest.importorskip("qiskit")
+
+from hhl4x4.custom_gates.comment import Comment, strip_comments
+from hhl4x4.utils.circuits import execute
+
+
+def _circuit_with_comments():
+    qreg = qiskit.QuantumRegister(2, "q")
+    circuit = qiskit.QuantumCircuit(qreg)
+    circuit.comment("Start.")
+    circuit.h(qreg[0])
+    gate = qiskit.CompositeGate("composite", [], [qreg[0], qreg[1]], circuit)
+    gate.comment("Inside a composite gate.")
+    gate.cx(qreg[0], qreg[1])
+    circuit._attach(gate)
+    circuit.comment("End.")
+    return circuit
+
+
+def _contains_comments(instructions):
+    return any(isinstance(instruction, Comment) or (
+        isinstance(instruction, qiskit.CompositeGate) and
+        _contains_comments(instruction.data)) for instruction in instructions)
+
+
+def test_strip_comments():
+    circuit = _circuit_with_comments()
+    stripped = strip_comments(circuit)
+    assert stripped.name == circuit.name
+    assert not _contains_comments(stripped.data)
+    assert [instruction.name for instruction in stripped.data] == ["h", "cx"]
+    # The comments stay in the OpenQASM code of the original circuit.
+    assert "// Start." in circuit.qasm()
+
+
+def test_execute_circuit_with_comments():
+    circuit = _circuit_with_comments()
+    backend = qiskit.Aer.get_backend('statevector_simulator')
+    result = execute([circuit], backend).result()
+    statevector = np.asarray(result.get_statevector(circuit))
+    expected = np.array([1, 0, 0, 1]) / np.sqrt(2)
+    assert np.allclose(statevector, expected)
@@ -0,0 +1,96 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Tests of the endianness of the registers."""
+
+import pytest
+
+pytest.importorskip("qiskit")
+
+from hhl4x4.utils.endianness import QRegisterBE, QRegisterLE, \
+    apply_BE_operation, swap_endianness
+
+
+class SwapRecorder:
+    """Container recording the SWAP gates instead of applying them."""
+
+    def __init__(self):
+        self.swaps = []
+
+    def swap(self, first, second):
+        self.swaps.append((first, second))
+
+
+@pytest.fixture
+def qreg():
+    return QRegisterBE(4, "q")
+
+
+def test_qubit_tables(qreg):
+    qubits = [qreg[i] for i in range(4)]
+    tables = qreg._get_qubit_tables()
+    assert tables == (tuple(qubits), tuple(qubits[::-1]))
+    # The tables are computed once.
+    assert qreg._get_qubit_tables() is tables
+
+
+def test_virtual_swap(qreg):
+    # The virtual swap only changes the table used to access the qubits.
+    qubits = [qreg[i] for i in range(4)]
+    tables = qreg._get_qubit_tables()
+    recorder = SwapRecorder()
+    swap_endianness(recorder, qreg, virtual=True)
+    assert recorder.swaps == []
+    assert [qreg[i] for i in range(4)] == qubits[::-1]
+    assert qreg._get_qubit_tables() is tables
+    swap_endianness(recorder, qreg, virtual=True)
+    assert [qreg[i] for i in range(4)] == qubits
+
+
+def test_swap(qreg):
+    # The real swap adds the SWAP gates and keeps the access order.
+    qubits = [qreg[i] for i in range(4)]
+    recorder = SwapRecorder()
+    swap_endianness(recorder, qreg)
+    assert recorder.swaps == [(qubits[0], qubits[3]), (qubits[1], qubits[2])]
+    assert [qreg[i] for i in range(4)] == qubits
+
+
+def test_apply_BE_operation_on_little_endian_register():
+    # The endianness of the register is restored after the operation.
+    qreg = QRegisterLE(3, "r")
+    qubits = [qreg[i] for i in range(3)]
+    seen = []
+    apply_BE_operation(None, lambda container, register: seen.extend(
+        register[i] for i in range(3)), qreg)
+    assert seen == qubits[::-1]
+    assert [qreg[i] for i in range(3)] == qubits
@@ -0,0 +1,80 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Tests of the register views."""
+
+import pytest
+
+pytest.importorskip("qiskit")
+
+from hhl4x4.utils.registers import PermutedQuantumRegister, QRegisterBase
+
+
+@pytest.fixture
+def qreg():
+    return QRegisterBase(4, "q")
+
+
+def test_access(qreg):
+    assert [qreg[i] for i in range(4)] == [(qreg, i) for i in range(4)]
+    assert [qreg[1:3][i] for i in range(2)] == [qreg[1], qreg[2]]
+
+
+def test_slices_follow_the_access_order(qreg):
+    qreg._reverse_access_endian()
+    assert [qreg[0:2][i] for i in range(2)] == [qreg[0], qreg[1]]
+    assert [qreg[0:2][i] for i in range(2)] == [(qreg, 3), (qreg, 2)]
+    assert [qreg[::2][i] for i in range(2)] == [(qreg, 3), (qreg, 1)]
+
+
+def test_view_does_not_follow_later_changes(qreg):
+    qreg._reverse_access_endian()
+    view = qreg[0:2]
+    qreg._reverse_access_endian()
+    assert [view[i] for i in range(2)] == [(qreg, 3), (qreg, 2)]
+
+
+def test_bonded_registers_keep_their_access_order(qreg):
+    other = QRegisterBase(2, "r")
+    other._reverse_access_endian()
+    bonded = qreg + other
+    assert [bonded[i] for i in range(6)] == \
+        [(qreg, i) for i in range(4)] + [(other, 1), (other, 0)]
+
+
+def test_permuted_register(qreg):
+    # Swapping qubits of a permuted register does not change the register.
+    permuted = PermutedQuantumRegister(qreg)
+    permuted.swap_qubits(1, 2)
+    assert [permuted[i] for i in range(4)] == \
+        [(qreg, 0), (qreg, 2), (qreg, 1), (qreg, 3)]
+    assert [qreg[i] for i in range(4)] == [(qreg, i) for i in range(4)]
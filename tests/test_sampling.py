@@ -0,0 +1,65 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Tests of the sampling of the eigenvalues with the iterative QPE."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("qiskit")
+
+from hhl4x4.optimise_parameters import A
+from hhl4x4.sampling import sample_eigenvalues
+
+
+def test_sample_eigenvalues():
+    result = sample_eigenvalues(clock_size=4, shots=200, seed=1)
+    assert result["shots"] == 200
+    assert result["qubits"] == 3
+    # The eigenvalues of A are exactly represented with 4 bits of phase, and
+    # the uniform |b> has a component on each eigenvector.
+    assert set(result["eigenvalues"]) == {1, 2, 4, 8}
+    assert sum(result["eigenvalues"].values()) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("index", range(4))
+def test_sample_eigenvalue_of_an_eigenvector(index):
+    eigenvalues, eigenvectors = np.linalg.eigh(A)
+
+    def prepare_b(circuit, qb):
+        circuit.initialize(eigenvectors[:, index].astype(complex).tolist(),
+                           [qb[0], qb[1]])
+
+    result = sample_eigenvalues(clock_size=4, shots=100, seed=1,
+                                prepare_b=prepare_b)
+    assert list(result["eigenvalues"].items()) == [
+        (pytest.approx(eigenvalues[index]), 1)]
@@ -0,0 +1,92 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""End-to-end tests of the solver."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("qiskit")
+
+import hhl4x4.solver as solver
+from hhl4x4.optimise_parameters import A, KNOWN_PARAMETERS
+
+
+@pytest.fixture(scope="module")
+def hhl_map():
+    return solver.linear_map()
+
+
+def test_linear_map_shape(hhl_map):
+    assert hhl_map.shape == (2 * 2 ** 4 * 4, 4)
+    # Each column is a normalised quantum state.
+    assert np.allclose(np.linalg.norm(hhl_map, axis=0), 1)
+
+
+def test_solve(hhl_map):
+    b_vectors = np.vstack([np.full(4, 0.5), np.eye(4)])
+    solutions, success_probabilities = solver.solve(b_vectors,
+                                                    hhl_map=hhl_map)
+    assert solutions.shape == (5, 4)
+    assert np.all((success_probabilities > 0) &
+                  (success_probabilities < 1))
+    for b, solution in zip(b_vectors, solutions):
+        x_exact = np.linalg.solve(A, b)
+        x_exact /= np.linalg.norm(x_exact)
+        # The solution is only known up to a global phase.
+        assert abs(np.vdot(x_exact, solution)) > 0.99
+
+
+def test_solve_uniform_b(hhl_map):
+    # The example of 4x4.py: the exact solution is [-1, 7, 11, 13] / 32.
+    solution, _ = solver.solve(np.full(4, 0.5), hhl_map=hhl_map)
+    x_exact = np.array([-1, 7, 11, 13]) / np.sqrt(340)
+    assert np.linalg.norm(solution[0] - x_exact) < 0.02
+
+
+def test_solve_rejects_zero_right_hand_sides(hhl_map):
+    b_vectors = np.array([np.ones(4), np.zeros(4), np.zeros(4)])
+    with pytest.raises(ValueError, match=r"\[1, 2\]"):
+        solver.solve(b_vectors, hhl_map=hhl_map)
+
+
+def test_known_parameters_are_used_without_optimisation(tmp_path,
+                                                         monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("The known parameters should be used.")
+
+    monkeypatch.setattr(solver, "optimise_power", fail)
+    for power, parameters in KNOWN_PARAMETERS.items():
+        assert solver.hamiltonian_parameters(
+            power, cache_directory=str(tmp_path)) == parameters
+    # Nothing is written to the cache.
+    assert list(tmp_path.iterdir()) == []
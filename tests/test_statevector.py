@@ -0,0 +1,88 @@
+# ======================================================================
+# Copyright CERFACS (November 2018)
+# Contributor: Adrien Suau (suau@cerfacs.fr)
+#
+# This software is governed by the CeCILL-B license under French law and
+# abiding  by the  rules of  distribution of free software. You can use,
+# modify  and/or  redistribute  the  software  under  the  terms  of the
+# CeCILL-B license as circulated by CEA, CNRS and INRIA at the following
+# URL "http://www.cecill.info".
+#
+# As a counterpart to the access to  the source code and rights to copy,
+# modify and  redistribute granted  by the  license, users  are provided
+# only with a limited warranty and  the software's author, the holder of
+# the economic rights,  and the  successive licensors  have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using, modifying and/or  developing or reproducing  the
+# software by the user in light of its specific status of free software,
+# that  may mean  that it  is complicated  to manipulate,  and that also
+# therefore  means that  it is reserved for  developers and  experienced
+# professionals having in-depth  computer knowledge. Users are therefore
+# encouraged  to load and  test  the software's  suitability as  regards
+# their  requirements  in  conditions  enabling  the  security  of their
+# systems  and/or  data to be  ensured and,  more generally,  to use and
+# operate it in the same conditions as regards security.
+#
+# The fact that you  are presently reading this  means that you have had
+# knowledge of the CeCILL-B license and that you accept its terms.
+# ======================================================================
+
+
+"""Tests of the manipulations of the statevectors."""
+
+import numpy as np
+import pytest
+
+from hhl4x4.utils.statevector import postselect, reorder_registers
+
+REGISTER_SIZES = [1, 3, 2]
+
+
+@pytest.fixture
+def statevector():
+    random_state = np.random.RandomState(0)
+    qubits_number = sum(REGISTER_SIZES)
+    statevector = random_state.randn(2 ** qubits_number) + \
+        1j * random_state.randn(2 ** qubits_number)
+    return statevector / np.linalg.norm(statevector)
+
+
+@pytest.mark.parametrize("big_endian", [None, [False, True, False],
+                                        [True, True, True]])
+def test_reorder_registers(statevector, big_endian):
+    # Reference: a loop over the amplitudes.
+    flags = big_endian or [False] * len(REGISTER_SIZES)
+    expected = np.empty_like(statevector)
+    for index, amplitude in enumerate(statevector):
+        reordered_index, offset = 0, 0
+        for size, is_big_endian in zip(REGISTER_SIZES, flags):
+            value = (index >> offset) & (2 ** size - 1)
+            if is_big_endian:
+                value = int(format(value, "0{}b".format(size))[::-1], 2)
+            reordered_index = (reordered_index << size) | value
+            offset += size
+        expected[reordered_index] = amplitude
+    assert np.array_equal(
+        reorder_registers(statevector, REGISTER_SIZES, big_endian), expected)
+
+
+@pytest.mark.parametrize("qubit_index", range(sum(REGISTER_SIZES)))
+@pytest.mark.parametrize("value", [False, True])
+def test_postselect(statevector, qubit_index, value):
+    # Reference: a loop over the amplitudes.
+    kept = [amplitude for index, amplitude in enumerate(statevector)
+            if (index >> qubit_index) & 1 == value]
+    probability = np.sum(np.abs(kept) ** 2)
+    selected, selected_probability = postselect(statevector, qubit_index,
+                                                value)
+    assert np.isclose(selected_probability, probability)
+    assert np.allclose(selected, kept / np.sqrt(probability))
+
+
+def test_postselect_errors(statevector):
+    with pytest.raises(IndexError):
+        postselect(statevector, sum(REGISTER_SIZES), True)
+    with pytest.raises(ValueError):
+        postselect(np.array([1, 0, 0, 0], dtype=complex), 0, True)